@@ -0,0 +1,102 @@
+"""
+Benchmark of default data resolution on wide models.
+
+It documents models with an increasing number of fields, all of them with
+default value, and shows time per field. Time per field must stay flat
+(linear growth) as default data is computed once per model.
+
+Default data is resolved lazily when property documenters render defaults,
+so whole model documenter (with all its members) is timed. It fails if
+default data is not computed exactly once per model documenter.
+
+Usage::
+
+    $ python benchmarks/bench_default_data.py
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add root
+
+from dirty_models.fields import IntegerField  # noqa: E402
+from dirty_models.models import BaseModel  # noqa: E402
+from sphinx.ext.autodoc import ALL, Options  # noqa: E402
+from sphinx.ext.autodoc.directive import DocumenterBridge  # noqa: E402
+from sphinx.util.docutils import LoggingReporter  # noqa: E402
+
+from dirty_models_sphinx.documenters import DirtyModelDocumenter  # noqa: E402
+from dirty_models_sphinx.introspection import clear_introspection_cache  # noqa: E402
+from dirty_models_sphinx.render import RenderState  # noqa: E402
+from synthetic import make_app  # noqa: E402
+
+FIELD_COUNTS = (10, 50, 100, 300, 1000)
+ROUNDS = 5
+
+
+def build_model(field_count):
+    fields = {'field_{}'.format(i): IntegerField(default=i) for i in range(field_count)}
+    return type('WideModel{}'.format(field_count), (BaseModel,), {'__module__': __name__, **fields})
+
+
+def count_default_data_calls(model):
+    """
+    Wraps ``get_default_data`` of model, so its calls are counted. It returns list of calls.
+    """
+    calls = []
+    get_default_data = model.get_default_data
+
+    def counted_get_default_data(*args, **kwargs):
+        calls.append(args)
+        return get_default_data()
+
+    model.get_default_data = staticmethod(counted_get_default_data)
+    return calls
+
+
+def generate(app, model):
+    bridge = DocumenterBridge(app.env, LoggingReporter(''), Options(members=ALL), 1, RenderState('index'))
+    documenter = DirtyModelDocumenter(bridge, '{}::{}'.format(model.__module__, model.__qualname__))
+    documenter.generate(all_members=True)
+    return bridge.result
+
+
+def time_generate(app, model):
+    calls = count_default_data_calls(model)
+    generate(app, model)  # warm up
+
+    elapsed = 0
+    for _ in range(ROUNDS):
+        clear_introspection_cache(app)
+        del calls[:]
+
+        start = default_timer()
+        result = generate(app, model)
+        elapsed += default_timer() - start
+
+        assert len(calls) == 1, 'default data computed {} times'.format(len(calls))
+        assert sum(1 for line in result if 'py:dirtymodelproperty::' in line) == len(model.get_structure())
+
+    return elapsed / ROUNDS
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(tmpdir, buildername='html')
+        app.env.temp_data['docname'] = 'index'
+
+        print('{:>8} {:>12} {:>16}'.format('fields', 'total (ms)', 'per field (us)'))
+        for field_count in FIELD_COUNTS:
+            model = build_model(field_count)
+            setattr(sys.modules[__name__], model.__qualname__, model)
+
+            elapsed = time_generate(app, model)
+            print('{:>8} {:>12.3f} {:>16.3f}'.format(field_count,
+                                                     elapsed * 1000,
+                                                     elapsed * 1000000 / field_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of documenters on synthetic models.
+
+Each scenario builds a module of synthetic models (see :func:`synthetic.build_models`)
+and documents its root model twice in an in-process Sphinx application: as a regular
+model and as structure. It shows time spent in :class:`DirtyModelDocumenter`,
+in :class:`DirtyModelPropertyDocumenter` for structures and in ``process_dirty_model_toc``.
+Model documenter time includes its members, so it includes structure time too.
+
+Usage::
+
+    $ python benchmarks/bench_documenters.py
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add root
+
+import dirty_models_sphinx  # noqa: E402
+from dirty_models_sphinx.documenters import DirtyModelDocumenter, DirtyModelPropertyDocumenter  # noqa: E402
+from synthetic import build_models, make_app, timed, timings  # noqa: E402
+
+SCENARIOS = [
+    {'name': 'narrow', 'width': 10},
+    {'name': 'wide', 'width': 300},
+    {'name': 'deep', 'width': 10, 'depth': 20},
+    {'name': 'arrays', 'width': 10, 'depth': 5, 'array_nesting': 3},
+    {'name': 'enums', 'width': 10, 'depth': 5, 'enum_size': 200},
+    {'name': 'fanout', 'width': 10, 'depth': 5, 'fanout': 10},
+]
+
+PAGE = """
+{name}
+==========
+
+.. autodirtymodel:: {module}.{model}
+    :members:
+
+.. autodirtymodel:: {module}.{model}
+    :members:
+    :as-structure:
+    :noindex:
+"""
+
+
+def install_timers():
+    DirtyModelDocumenter.generate = timed('model', DirtyModelDocumenter.generate)
+    DirtyModelPropertyDocumenter.generate = timed('structure', DirtyModelPropertyDocumenter.generate,
+                                                  lambda d: d.options.get('as-structure', False))
+    dirty_models_sphinx.process_dirty_model_toc = timed('toc', dirty_models_sphinx.process_dirty_model_toc)
+
+
+def run_scenario(scenario):
+    timings.clear()
+    params = {k: v for k, v in scenario.items() if k != 'name'}
+    module_name = 'synthetic_{}'.format(scenario['name'])
+    model = build_models(module_name, **params)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(tmpdir, {scenario['name']: PAGE.format(name=scenario['name'],
+                                                              module=module_name,
+                                                              model=model.__qualname__)})
+        start = default_timer()
+        app.build(force_all=True)
+        timings['build'] = default_timer() - start
+
+    return dict(timings)
+
+
+def main():
+    install_timers()
+    run_scenario(SCENARIOS[0])  # warm up
+
+    print('{:>10} {:>12} {:>16} {:>10} {:>12}'.format('scenario', 'model (ms)', 'structure (ms)',
+                                                      'toc (ms)', 'build (ms)'))
+    for scenario in SCENARIOS:
+        result = run_scenario(scenario)
+        print('{:>10} {:>12.1f} {:>16.1f} {:>10.1f} {:>12.1f}'.format(scenario['name'],
+                                                                      result.get('model', 0) * 1000,
+                                                                      result.get('structure', 0) * 1000,
+                                                                      result.get('toc', 0) * 1000,
+                                                                      result['build'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of structure fragment cache.
+
+It documents a synthetic model (see :func:`synthetic.build_models`) whose nested model
+is embedded as structure on many pages, with and without in-build cache of structure
+fragments (``dirty_model_structure_cache_size``). It shows time spent in
+:class:`DirtyModelPropertyDocumenter` for structures.
+
+Usage::
+
+    $ python benchmarks/bench_fragments.py
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add root
+
+from dirty_models_sphinx.documenters import DirtyModelPropertyDocumenter  # noqa: E402
+from synthetic import build_models, make_app, timed, timings  # noqa: E402
+
+MODULE_NAME = 'synthetic_fragments'
+
+PAGES = 50
+
+PAGE = """
+Page {index}
+==========
+
+.. autodirtymodelproperty:: {module}.{model}.nested_0
+    :as-structure:
+    :noindex:
+"""
+
+
+def install_timers():
+    DirtyModelPropertyDocumenter.generate = timed('structure', DirtyModelPropertyDocumenter.generate)
+
+
+def run(cache_size, model):
+    timings.clear()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(tmpdir,
+                       {'page_{}'.format(i): PAGE.format(index=i, module=MODULE_NAME, model=model.__qualname__)
+                        for i in range(PAGES)},
+                       confoverrides={'dirty_model_structure_cache_size': cache_size})
+        start = default_timer()
+        app.build(force_all=True)
+        timings['build'] = default_timer() - start
+
+    return dict(timings)
+
+
+def main():
+    model = build_models(MODULE_NAME, width=20, depth=5, enum_size=20)
+    install_timers()
+    run(0, model)  # warm up
+
+    print('{} pages embedding a structure of {} nested models'.format(PAGES, 4))
+    print('{:>10} {:>16} {:>12}'.format('cache', 'structure (ms)', 'build (ms)'))
+    for cache_size in (0, 128):
+        result = run(cache_size, model)
+        print('{:>10} {:>16.1f} {:>12.1f}'.format(cache_size or 'off',
+                                                  result['structure'] * 1000,
+                                                  result['build'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
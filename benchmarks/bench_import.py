@@ -0,0 +1,119 @@
+"""
+Benchmark of extension import time.
+
+It imports extension on a fresh interpreter using ``python -X importtime`` and shows
+its import time and slowest modules it imports. Modules Sphinx already imports on any
+build (application, Python domain and `autodoc`) are imported before, so they are not
+taken into account.
+
+It also guards against regressions: it fails if Dirty Models is imported by extension,
+or by a Sphinx application setup which does not document any model. It fails as well if
+extension imports heavy standard library modules used only by some commands (process pools),
+or if it exceeds its budget of imported modules or import time.
+
+Usage::
+
+    $ python benchmarks/bench_import.py
+"""
+
+import os
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BENCHMARKS_DIR, '..'))
+
+PRELOAD = 'import sphinx.application, sphinx.domains.python, sphinx.ext.autodoc'
+
+DEFERRED_PACKAGES = ('dirty_models',)
+
+HEAVY_MODULES = ('concurrent.futures.process', 'asyncio')  # Not imported by Sphinx before any build
+
+MAX_MODULES = 25
+
+MAX_IMPORT_TIME = 50  # ms
+
+TOP = 10
+
+SETUP = """
+import sys, tempfile
+sys.path[:0] = [{root!r}, {benchmarks!r}]
+from synthetic import make_app
+with tempfile.TemporaryDirectory() as tmpdir:
+    make_app(tmpdir)
+print('\\n'.join(sys.modules))
+"""
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def get_import_times(statement):
+    """
+    Returns a dictionary of module name to ``(self time, cumulative time)`` in microseconds.
+    """
+    times = {}
+    for line in run_python('-X', 'importtime', '-c', statement).stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        if not self_time.strip().isdigit():
+            continue  # Header
+
+        times[name.strip()] = (int(self_time), int(cumulative_time))
+
+    return times
+
+
+def is_deferred(module_name):
+    return module_name.split('.')[0] in DEFERRED_PACKAGES
+
+
+def is_heavy(module_name):
+    return any(module_name == name or module_name.startswith(name + '.') for name in HEAVY_MODULES)
+
+
+def main():
+    run_python('-m', 'compileall', '-q', 'dirty_models_sphinx')  # Do not measure bytecode compilation
+
+    preloaded = get_import_times(PRELOAD)
+    times = get_import_times(PRELOAD + '; import dirty_models_sphinx')
+    imported = {name: t for name, t in times.items() if name not in preloaded}
+
+    import_time = times['dirty_models_sphinx'][1] / 1000
+    print('extension import: {:.1f} ms ({} modules)'.format(import_time, len(imported)))
+    print('{:>12} {:>12}  {}'.format('self (ms)', 'cumul. (ms)', 'module'))
+    for name, (self_time, cumulative_time) in sorted(imported.items(), key=lambda i: i[1][0], reverse=True)[:TOP]:
+        print('{:>12.1f} {:>12.1f}  {}'.format(self_time / 1000, cumulative_time / 1000, name))
+
+    setup_modules = run_python('-c', SETUP.format(root=ROOT_DIR, benchmarks=BENCHMARKS_DIR)).stdout.split()
+
+    failed = False
+    deferred = sorted({name for name in imported if is_deferred(name)}
+                      | {name for name in setup_modules if is_deferred(name)})
+    if deferred:
+        print('Modules which must be imported on first use were imported: {}'.format(', '.join(deferred)))
+        failed = True
+
+    heavy = sorted(name for name in imported if is_heavy(name))
+    if heavy:
+        print('Heavy modules were imported by extension: {}'.format(', '.join(heavy)))
+        failed = True
+
+    if len(imported) > MAX_MODULES:
+        print('Extension imports {} modules, budget is {}'.format(len(imported), MAX_MODULES))
+        failed = True
+
+    if import_time > MAX_IMPORT_TIME:
+        print('Extension import takes {:.1f} ms, budget is {} ms'.format(import_time, MAX_IMPORT_TIME))
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of model preload on a process pool (``dirty_model_preload``).
+
+It writes a package of synthetic model modules and builds a project which documents
+all of them, with and without preload. Build time includes application setup, because
+models are preloaded when builder is initialized. Each build uses a copy of package
+with a different name, so modules are imported from scratch every time.
+
+Preload only pays off if snapshots taken by workers save more time than it takes to
+start worker processes and to import every module twice (on workers and on main process).
+
+Usage::
+
+    $ python benchmarks/bench_preload.py
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add root
+
+from synthetic import make_app  # noqa: E402
+
+MODULES = 20
+
+MODELS = 10
+
+WIDTH = 30
+
+SCENARIOS = [
+    {'name': 'off'},
+    {'name': '1 job', 'dirty_model_preload_jobs': 1},
+    {'name': 'all CPUs', 'dirty_model_preload_jobs': 0},
+]
+
+PAGE = """
+{module}
+==========
+
+.. autodirtymodule:: {module}
+    :include: {module}.*
+"""
+
+
+def build_module_source():
+    lines = ['from dirty_models.fields import IntegerField, StringField',
+             'from dirty_models.models import BaseModel',
+             '']
+    for i in range(MODELS):
+        lines.extend(['', '', 'class Model{}(BaseModel):'.format(i), '    """Synthetic model {}."""'.format(i)])
+        for j in range(WIDTH):
+            if j % 2:
+                lines.append("    field_{0} = StringField(default='value {0}', doc='String field {0}.')".format(j))
+            else:
+                lines.append("    field_{0} = IntegerField(default={0}, doc='Integer field {0}.')".format(j))
+    return '\n'.join(lines) + '\n'
+
+
+def write_package(path, package):
+    package_dir = os.path.join(path, package)
+    os.makedirs(package_dir)
+    with open(os.path.join(package_dir, '__init__.py'), 'w') as f:
+        f.write('')
+
+    source = build_module_source()
+    for i in range(MODULES):
+        with open(os.path.join(package_dir, 'models_{}.py'.format(i)), 'w') as f:
+            f.write(source)
+
+    return ['{}.models_{}'.format(package, i) for i in range(MODULES)]
+
+
+def run_scenario(path, index, scenario):
+    package = 'bench_preload_{}'.format(index)
+    modules = write_package(path, package)
+
+    confoverrides = {k: v for k, v in scenario.items() if k != 'name'}
+    if confoverrides:
+        confoverrides['dirty_model_preload'] = [package]
+
+    srcdir = os.path.join(path, 'project_{}'.format(index))
+    os.makedirs(srcdir)
+
+    start = default_timer()
+    app = make_app(srcdir, {module.replace('.', '_'): PAGE.format(module=module) for module in modules},
+                   confoverrides=confoverrides)
+    app.build(force_all=True)
+    return default_timer() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sys.path.insert(0, tmpdir)
+
+        run_scenario(tmpdir, 'warmup', SCENARIOS[0])
+
+        print('{} modules of {} models with {} fields ({} CPUs)'.format(MODULES, MODELS, WIDTH, os.cpu_count()))
+        print('{:>10} {:>12}'.format('preload', 'build (ms)'))
+        for index, scenario in enumerate(SCENARIOS):
+            elapsed = run_scenario(tmpdir, index, scenario)
+            print('{:>10} {:>12.1f}'.format(scenario['name'], elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark of cross reference resolution.
+
+It documents synthetic models (see :func:`synthetic.build_models`) and a page with many
+references to them, using exact names and ``.`` prefixed names (fuzzy search). It shows
+time spent resolving references with and without :class:`DirtyModelReferencesResolver`.
+
+It also checks that :class:`ReferenceIndex` finds same objects than Python domain for every
+Python reference of the project, so a change on Python domain lookups does not change silently
+how references are resolved. It fails if any lookup differs.
+
+Usage::
+
+    $ python benchmarks/bench_references.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Add root
+
+from sphinx import addnodes  # noqa: E402
+from sphinx.transforms.post_transforms import ReferencesResolver  # noqa: E402
+
+from dirty_models_sphinx.references import DirtyModelReferencesResolver, ReferenceIndex  # noqa: E402
+from synthetic import build_models, make_app, timed, timings  # noqa: E402
+
+MODULE_NAME = 'synthetic_references'
+
+WIDTH = 50
+
+DEPTH = 40
+
+REFERENCES = 20000
+
+MAX_MISMATCHES = 10
+
+MODEL_PAGE = """
+Models
+======
+
+.. autodirtymodule:: {module}
+    :include: {module}.*
+"""
+
+# References which exercise every kind of lookup: module context, class context, module
+# references, roles which do not match object type and missing objects
+LOOKUPS_PAGE = """
+Lookups
+=======
+
+.. currentmodule:: {module}
+
+* :py:mod:`{module}`
+* :py:class:`Level0Model`
+* :py:attr:`Level0Model.field_1`
+* :py:meth:`Level0Model.field_1`
+* :py:obj:`.field_1`
+* :py:class:`~.Level1Model`
+* :py:mod:`.Level1Model`
+* :py:class:`NotExisting`
+* :py:attr:`.not_existing`
+
+.. py:class:: Level2Model
+    :noindex:
+
+    * :py:attr:`field_2`
+    * :py:attr:`.field_3`
+    * :py:class:`Level3Model`
+"""
+
+
+def build_references_page():
+    lines = ['References', '==========', '']
+    for i in range(REFERENCES):
+        level = i % DEPTH
+        field = i % WIDTH
+        if i % 4 == 0:
+            lines.append('* :py:class:`{}.Level{}Model`'.format(MODULE_NAME, level))
+        elif i % 4 == 1:
+            lines.append('* :py:attr:`{}.Level{}Model.field_{}`'.format(MODULE_NAME, level, field))
+        elif i % 4 == 2:
+            lines.append('* :py:class:`.Level{}Model`'.format(level))
+        else:
+            lines.append('* :py:attr:`.Level{}Model.field_{}`'.format(level, field))
+    return '\n'.join(lines) + '\n'
+
+
+def check_lookups(app):
+    """
+    Returns a list of ``(docname, reference, expected, found)`` of Python references which
+    :class:`ReferenceIndex` does not resolve to same objects than Python domain, and the number
+    of references checked.
+    """
+    env = app.env
+    domain = env.get_domain('py')
+    index = ReferenceIndex(domain)
+
+    mismatches = []
+    checked = 0
+    for docname in sorted(env.found_docs):
+        for node in env.get_doctree(docname).findall(addnodes.pending_xref):
+            if node.get('refdomain') != 'py':
+                continue
+
+            args = (node.get('py:module'), node.get('py:class'), node['reftarget'], node['reftype'],
+                    1 if node.hasattr('refspecific') else 0)
+            expected = domain.find_obj(env, *args)
+            found = index.find_obj(*args)
+            checked += 1
+            if found != expected:
+                mismatches.append((docname, node.rawsource or node['reftarget'], expected, found))
+
+    return mismatches, checked
+
+
+def run(enabled, check=False):
+    """
+    Returns time spent resolving references and, if ``check`` is set, result of :func:`check_lookups`.
+    """
+    timings.clear()
+    lookups = None
+
+    run_resolver = DirtyModelReferencesResolver.run
+    if not enabled:
+        DirtyModelReferencesResolver.run = lambda self, **kwargs: None
+
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            app = make_app(tmpdir, {'models': MODEL_PAGE.format(module=MODULE_NAME),
+                                    'references': build_references_page(),
+                                    'lookups': LOOKUPS_PAGE.format(module=MODULE_NAME)})
+            app.build(force_all=True)
+
+            if check:
+                lookups = check_lookups(app)
+    finally:
+        DirtyModelReferencesResolver.run = run_resolver
+
+    return timings['dirty'] + timings['domain'], lookups
+
+
+def main():
+    build_models(MODULE_NAME, width=WIDTH, depth=DEPTH)
+
+    ReferencesResolver.run = timed('domain', ReferencesResolver.run)
+    DirtyModelReferencesResolver.run = timed('dirty', DirtyModelReferencesResolver.run)
+
+    print('{} references to {} models of {} fields'.format(REFERENCES, DEPTH, WIDTH))
+    print('{:>10} {:>22}'.format('index', 'resolution (ms)'))
+    for enabled in (False, True):
+        elapsed, lookups = run(enabled, check=enabled)
+        print('{:>10} {:>22.1f}'.format('on' if enabled else 'off', elapsed * 1000))
+
+    mismatches, checked = lookups
+    print('{} lookups checked against Python domain, {} differ'.format(checked, len(mismatches)))
+    for docname, reference, expected, found in mismatches[:MAX_MISMATCHES]:
+        print('    {}: {} (Python domain: {} objects, index: {} objects)'.format(
+            docname, reference, len(expected), len(found)))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
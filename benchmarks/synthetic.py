@@ -0,0 +1,115 @@
+"""
+Synthetic models, Sphinx application and timers for benchmarks.
+"""
+
+import os
+import sys
+from collections import defaultdict
+from enum import Enum
+from functools import wraps
+from timeit import default_timer
+from types import ModuleType
+
+from sphinx.application import Sphinx
+
+#: Time spent on each key timed by :func:`timed`, in seconds
+timings = defaultdict(float)
+
+
+def build_models(module_name, width=10, depth=1, array_nesting=0, enum_size=0, fanout=1):
+    """
+    Build a module with synthetic models and register it on :data:`sys.modules`, so autodoc
+    could import it.
+
+    :param module_name: Name of module.
+    :param width: Number of scalar fields of each model.
+    :param depth: Number of levels of nested models. Each level has a model with fields
+                  which reference model of previous level.
+    :param array_nesting: Number of arrays which wrap each nested model field.
+    :param enum_size: Number of members of an enumeration used by a field of each model.
+                      If it is ``0`` no enumeration is used.
+    :param fanout: Number of fields of each model which reference the same nested model.
+    :return: Root model (the one of last level).
+    """
+    # Dirty Models is imported here, so make_app could be used to check what extension imports
+    from dirty_models.fields import ArrayField, EnumField, IntegerField, ModelField, StringField
+    from dirty_models.models import BaseModel
+
+    module = ModuleType(module_name)
+    sys.modules[module_name] = module
+
+    enum_class = None
+    if enum_size:
+        enum_class = Enum('SyntheticEnum', [('value_{}'.format(i), i) for i in range(enum_size)],
+                          module=module_name)
+        module.SyntheticEnum = enum_class
+
+    model = None
+    for level in range(depth):
+        attrs = {'__module__': module_name,
+                 '__qualname__': 'Level{}Model'.format(level),
+                 '__doc__': 'Synthetic model of level {}.'.format(level)}
+
+        for i in range(width):
+            if i % 2:
+                attrs['field_{}'.format(i)] = StringField(doc='String field *{}* of level {}.'.format(i, level))
+            else:
+                attrs['field_{}'.format(i)] = IntegerField(default=i, doc='Integer field {}.'.format(i))
+
+        if enum_class is not None:
+            attrs['enum_field'] = EnumField(enum_class=enum_class, default=enum_class['value_0'])
+
+        if model is not None:
+            for i in range(fanout):
+                field = ModelField(model_class=model)
+                for _ in range(array_nesting):
+                    field = ArrayField(field_type=field)
+                attrs['nested_{}'.format(i)] = field
+
+        model = type(attrs['__qualname__'], (BaseModel,), attrs)
+        setattr(module, model.__qualname__, model)
+
+    return model
+
+
+def make_app(srcdir, pages=None, buildername='dummy', confoverrides=None):
+    """
+    Create an in-process Sphinx application for a project on ``srcdir`` with given pages.
+
+    :param pages: Dictionary of document name to reST content. Page ``index`` is added
+                  if it is not defined.
+    """
+    pages = dict(pages or {})
+    pages.setdefault('index', 'Benchmark\n=========\n\n.. toctree::\n\n{}'.format(
+        ''.join('   {}\n'.format(name) for name in pages)))
+
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write("extensions = ['sphinx.ext.autodoc', 'dirty_models_sphinx']\n")
+
+    for name, content in pages.items():
+        with open(os.path.join(srcdir, '{}.rst'.format(name)), 'w') as f:
+            f.write(content)
+
+    return Sphinx(srcdir, srcdir, os.path.join(srcdir, '_build'), os.path.join(srcdir, '_doctrees'),
+                  buildername, confoverrides=confoverrides, status=None, warning=None)
+
+
+def timed(key, func, condition=None):
+    """
+    Wrap ``func``, so time spent on it is added to ``timings[key]``.
+
+    :param condition: Function which receives first argument of each call (usually ``self``).
+                      Calls are only timed when it returns ``True``.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if condition is not None and not condition(args[0]):
+            return func(*args, **kwargs)
+
+        start = default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[key] += default_timer() - start
+
+    return wrapper
@@ -1,4 +1,5 @@
-from logging import getLogger
+import re
+from functools import lru_cache
 
 import sphinx.domains.python
 import sphinx.ext.autodoc
@@ -7,13 +8,24 @@ from docutils import nodes
 from docutils.parsers.rst import directives
 from docutils.statemachine import ViewList
 from sphinx import addnodes
+from sphinx.config import ENUM
 from sphinx.domains.python import PyAttribute
 from sphinx.locale import _
+from sphinx.util import logging
 from sphinx.util.docfields import Field, GroupedField
+from sphinx.util.docutils import SphinxDirective
 
+from .cache import prune_documenter_cache
+from .dependencies import get_outdated_docs, merge_doc_dependencies, purge_doc_dependencies
 from .documenters import DirtyEnumDocumenter, DirtyModelDocumenter, DirtyModelPropertyDocumenter, DirtyModuleDocumenter
+from .fragments import clear_fragment_cache, log_fragment_stats, merge_fragment_stats
+from .introspection import clear_introspection_cache
+from .profiling import get_object_path, merge_profile_data, profile, start_profiling, write_profile_report
+from .references import DirtyModelReferencesResolver, clear_reference_index
+from .snapshots import preload_snapshots
+from .stubs import generate_model_stubs
 
-logger = getLogger(__name__)
+logger = logging.getLogger(__name__)
 
 __version__ = '0.6.2'
 
@@ -27,6 +39,46 @@ def access_mode(argument):
     return directives.choice(argument, values=list(access_mode_labels.keys()))
 
 
+type_role_re = re.compile(r':(?:py:)?(?P<role>class|obj|attr|data|exc|func|meth|mod):`(?P<target>[^`]+)`')
+
+plain_text_re = re.compile(r'^[\w\s(),.-]*$')
+
+
+@lru_cache(maxsize=None)
+def parse_type_description(text):
+    """
+    Parse a field type description (``:type:`` option) into a tuple of plain text strings and
+    ``(role, target)`` tuples for Python domain cross references. It returns ``None`` if description
+    uses any other reST markup.
+    """
+    result = []
+    pos = 0
+    for match in type_role_re.finditer(text):
+        if match.start() > pos:
+            result.append(text[pos:match.start()])
+        result.append((match.group('role'), match.group('target')))
+        pos = match.end()
+
+    if pos < len(text):
+        result.append(text[pos:])
+
+    if any(isinstance(item, str) and not plain_text_re.match(item) for item in result):
+        return None
+
+    return tuple(result)
+
+
+def is_toc_bounded(config):
+    """
+    Whether TOC entries of models are bounded by ``dirty_model_toc_max_attributes`` or
+    ``dirty_model_toc_max_depth``. Then, entries added by Sphinx for each object description
+    are not used, because they are not bounded. It includes descriptions of model members
+    which are not fields, like methods.
+    """
+    return config.dirty_model_add_classes_to_toc and bool(config.dirty_model_toc_max_attributes
+                                                          or config.dirty_model_toc_max_depth)
+
+
 class ModelHeading(object):
     """
     A heading level that is not defined by a string. We need this to work with
@@ -117,19 +169,44 @@ class DirtyModelDirective(sphinx.domains.python.PyClasslike):
 
         return self.options['title'], self.options['title']
 
-    def run(self):
-        result = super(DirtyModelDirective, self).run()
+    def _toc_entry_name(self, sig_node):
+        if is_toc_bounded(self.env.app.config):
+            return ''
+        return super(DirtyModelDirective, self)._toc_entry_name(sig_node)
 
-        if self.env.app.config.dirty_model_add_classes_to_toc:
+    def run(self):
+        with profile('directive', get_object_path(self.options.get('module', self.env.ref_context.get('py:module')),
+                                                  self.arguments[0])):
+            return self.build_nodes()
+
+    def build_nodes(self):
+        config = self.env.app.config
+        depth = self.env.temp_data.get('dirty_models:toc_depth', 0) + 1
+
+        # Nested models are parsed while outer model directive runs, so depth is kept on build environment
+        self.env.temp_data['dirty_models:toc_depth'] = depth
+        try:
+            result = super(DirtyModelDirective, self).run()
+        finally:
+            self.env.temp_data['dirty_models:toc_depth'] = depth - 1
+
+        if is_toc_bounded(config):
+            # Member descriptions which are not dirty ones (methods, constants) are not bounded either
+            for node in result:
+                for signode in node.findall(addnodes.desc_signature):
+                    signode['_toc_name'] = ''
+
+        max_depth = config.dirty_model_toc_max_depth
+
+        if config.dirty_model_add_classes_to_toc and (not max_depth or depth <= max_depth):
             signode = result[1][0]
             if len(signode['ids']) == 0:
                 return result
 
-            result[1] = nodes.section(signode['fullname'], nodes.title(signode['fullname'], signode['fullname'],
-                                                                       classes=['remove-node']),
-                                      result[1],
-                                      ids=signode['ids'])
-            if self.env.app.config.dirty_model_add_attributes_to_toc:
+            title = note_removable_node(self.env, nodes.title(signode['fullname'], signode['fullname'],
+                                                              classes=['remove-node']))
+            result[1] = nodes.section(signode['fullname'], title, result[1], ids=signode['ids'])
+            if config.dirty_model_add_attributes_to_toc and (not max_depth or depth < max_depth):
 
                 def get_desc_name(node):
                     for subnode in node:
@@ -138,25 +215,41 @@ class DirtyModelDirective(sphinx.domains.python.PyClasslike):
 
                     return node[0]
 
-                for node in result[1][1][1]:
-                    if not isinstance(node, addnodes.desc) \
-                            or node['desctype'] not in ('attribute',
-                                                        'dirtymodelproperty',
-                                                        'dirtymodeladditionalproperties',
-                                                        'method',
-                                                        'classmethod',
-                                                        'class') \
-                            or len(node[0]['ids']) == 0:
-                        continue
+                attributes = [node for node in result[1][1][1]
+                              if isinstance(node, addnodes.desc)
+                              and node['desctype'] in ('attribute',
+                                                       'dirtymodelproperty',
+                                                       'dirtymodeladditionalproperties',
+                                                       'method',
+                                                       'classmethod',
+                                                       'class')
+                              and len(node[0]['ids']) > 0]
+
+                max_attributes = config.dirty_model_toc_max_attributes
+                if max_attributes and len(attributes) > max_attributes:
+                    attributes, collapsed = attributes[:max_attributes], attributes[max_attributes:]
+                else:
+                    collapsed = []
+
+                for node in attributes:
                     namenode = get_desc_name(node[0])
                     label = namenode.astext()
                     if node['desctype'] in ('method', 'classmethod'):
                         label += '()'
-                    result[1] += nodes.section(label,
-                                               nodes.title(label,
-                                                           label),
-                                               ids=node[0]['ids'],
-                                               classes=['remove-node'])
+                    result[1] += note_removable_node(self.env, nodes.section(label,
+                                                                             nodes.title(label,
+                                                                                         label),
+                                                                             ids=node[0]['ids'],
+                                                                             classes=['remove-node']))
+
+                if len(collapsed):
+                    # Collapsed attributes are summarized by a single entry which links to first of them
+                    label = _('%d more attributes') % len(collapsed)
+                    result[1] += note_removable_node(self.env, nodes.section(label,
+                                                                             nodes.title(label,
+                                                                                         label),
+                                                                             ids=collapsed[0][0]['ids'],
+                                                                             classes=['remove-node']))
 
         return result
 
@@ -189,6 +282,9 @@ class DirtyModelPropertyDirective(sphinx.domains.python.PyAttribute):
         'suffix': directives.unchanged,
     }
 
+    #: Structure property to render as nodes (see :class:`DirtyModelStructureDirective`)
+    structure_property = None
+
     doc_field_types = [
         Field('fieldtype', label=_('Type'), has_arg=False,
               names=('fieldtype',)),
@@ -235,14 +331,7 @@ class DirtyModelPropertyDirective(sphinx.domains.python.PyAttribute):
 
         if typ:
             signode += addnodes.desc_annotation('', ': ')
-            self.state.nested_parse(ViewList([self.options.get('type')]), 0, signode)
-
-            para = signode.pop(-1)
-            for child in para.children:
-                child.parent = signode
-                signode += child
-
-            para.children = []
+            self.add_type_annotation(signode, typ)
         elif 'as-structure' in self.options:
             signode += addnodes.desc_annotation('', ': ')
 
@@ -256,6 +345,68 @@ class DirtyModelPropertyDirective(sphinx.domains.python.PyAttribute):
 
         return result
 
+    def _toc_entry_name(self, sig_node):
+        if is_toc_bounded(self.env.app.config):
+            return ''
+        return super(DirtyModelPropertyDirective, self)._toc_entry_name(sig_node)
+
+    def add_type_annotation(self, signode, typ):
+        """
+        Add field type nodes to signature. Cross references are built calling Python domain
+        roles directly, so there is no need to parse type description as reST. Descriptions
+        with any other markup are parsed as usual.
+        """
+        with profile('signature'):
+            self.build_type_annotation(signode, typ)
+
+    def build_type_annotation(self, signode, typ):
+        description = parse_type_description(typ)
+        if description is None:
+            self.state.nested_parse(ViewList([typ]), 0, signode)
+
+            para = signode.pop(-1)
+            for child in para.children:
+                child.parent = signode
+                signode += child
+
+            para.children = []
+            return
+
+        domain = self.env.get_domain('py')
+        for item in description:
+            if isinstance(item, str):
+                signode += nodes.Text(item)
+                continue
+
+            role, target = item
+            result, messages = domain.role(role)('py:' + role,
+                                                 ':py:{0}:`{1}`'.format(role, target),
+                                                 target,
+                                                 self.lineno,
+                                                 self.state.inliner,
+                                                 {},
+                                                 [])
+            signode += result
+            signode += messages
+
+    def transform_content(self, contentnode):
+        super(DirtyModelPropertyDirective, self).transform_content(contentnode)
+
+        if self.structure_property is None:
+            return
+
+        field_list = build_field_list(self, self.structure_property.fields)
+        if len(field_list):
+            contentnode += field_list
+
+        if self.structure_property.reference is not None:
+            contentnode += build_structure_reference(self, *self.structure_property.reference)
+
+        contentnode.extend(build_structure_nodes(self, self.structure_property.children))
+
+        if self.structure_property.truncated is not None:
+            contentnode += build_structure_truncation(self, self.structure_property.truncated)
+
     def get_signature_prefix(self, sig):
         if 'as-structure' in self.options:
             return ''
@@ -276,14 +427,7 @@ class DirtyModelAdditionalPropertiesDirective(DirtyModelPropertyDirective):
 
         if typ:
             signode += addnodes.desc_annotation('', ': ')
-            self.state.nested_parse(ViewList([self.options.get('type')]), 0, signode)
-
-            para = signode.pop(-1)
-            for child in para.children:
-                child.parent = signode
-                signode += child
-
-            para.children = []
+            self.add_type_annotation(signode, typ)
         elif 'as-structure' in self.options:
             signode += addnodes.desc_annotation('', ': ')
 
@@ -298,29 +442,124 @@ class DirtyModelAdditionalPropertiesDirective(DirtyModelPropertyDirective):
         return 'Additional properties', ''
 
 
+def build_field_list(directive, fields):
+    """
+    Build a field list from ``(name, value)`` items. Values are parsed as inline reST.
+    """
+    field_list = nodes.field_list()
+    for name, value in fields:
+        body = nodes.field_body()
+        if value is not None and len(value):
+            textnodes, messages = directive.state.inline_text(value, directive.lineno)
+            body += nodes.paragraph(value, '', *textnodes)
+            body += messages
+        field_list += nodes.field('', nodes.field_name(name, name), body)
+    return field_list
+
+
+def build_structure_reference(directive, title, label):
+    textnodes, messages = directive.env.get_domain('std').role('ref')('std:ref',
+                                                                      ':ref:`{0} <{1}>`'.format(title, label),
+                                                                      '{0} <{1}>'.format(title, label),
+                                                                      directive.lineno,
+                                                                      directive.state.inliner,
+                                                                      {},
+                                                                      [])
+    return nodes.paragraph('', '', nodes.Text('Structure described at '), *textnodes, nodes.Text('.'), *messages)
+
+
+def build_structure_truncation(directive, model_path):
+    textnodes, messages = directive.env.get_domain('py').role('class')('py:class',
+                                                                       ':py:class:`~{}`'.format(model_path),
+                                                                       '~{}'.format(model_path),
+                                                                       directive.lineno,
+                                                                       directive.state.inliner,
+                                                                       {},
+                                                                       [])
+    return nodes.paragraph('', '', nodes.Text('Structure truncated, described at '), *textnodes, nodes.Text('.'),
+                           *messages)
+
+
+def build_structure_nodes(directive, properties):
+    """
+    Build nodes for structure properties. Each property is rendered running a
+    `'dirtymodelproperty'` directive with already resolved options, so no reST is
+    generated nor parsed but docstrings.
+    """
+    result = []
+    for prop in properties:
+        if prop.label is not None:
+            target = nodes.target('', '')
+            target['names'].append(nodes.fully_normalize_name(prop.label))
+            directive.state.document.note_explicit_target(target)
+            result.append(target)
+
+        prop_directive = DirtyModelPropertyDirective('py:dirtymodelproperty',
+                                                     [prop.name],
+                                                     dict(prop.options),
+                                                     ViewList(prop.docstring, '<autodoc>'),
+                                                     directive.lineno,
+                                                     directive.content_offset,
+                                                     '',
+                                                     directive.state,
+                                                     directive.state_machine)
+        prop_directive.structure_property = prop
+        result.extend(prop_directive.run())
+
+    return result
+
+
+class DirtyModelStructureDirective(SphinxDirective):
+    """
+    A `'dirtymodelstructure'` directive. It renders a structure generated by
+    :class:`~dirty_models_sphinx.documenters.DirtyModelPropertyDocumenter` directly as nodes.
+    It is used when ``dirty_model_structure_renderer`` is ``'nodes'``.
+    """
+
+    required_arguments = 1
+
+    def run(self):
+        properties = self.env.temp_data['dirty_models:structures'].pop(self.arguments[0])
+        with profile('structure'):
+            return build_structure_nodes(self, properties)
+
+
+def note_removable_node(env, node):
+    """
+    Record a node which is only needed to build TOC tree. It is removed from document
+    by :func:`process_dirty_model_toc`.
+    """
+    env.temp_data.setdefault('dirty_models:remove_nodes', []).append(node)
+    return node
+
+
 def process_dirty_model_toc(app, doctree):
     """
     Insert items described in autosummary:: to the TOC tree, but do
     not generate the toctree:: list.
 
+    Nodes created just for TOC tree were recorded by `'dirtymodel'` directives
+    on current document, so there is no need to search them.
     """
     if not app.config.dirty_model_add_classes_to_toc:
         return
 
-    crawled = {}
+    with profile('toc'):
+        for node in app.env.temp_data.pop('dirty_models:remove_nodes', []):
+            if node.parent is not None:
+                node.replace_self(nodes.comment())
 
-    def crawl_toc(node):
-        crawled[node] = True
-        for j, subnode in enumerate(node):
-            try:
-                if 'remove-node' in subnode['classes']:
-                    subnode.replace_self(nodes.comment())
-            except Exception:
-                continue
-            if subnode not in crawled:
-                crawl_toc(subnode)
 
-    crawl_toc(doctree)
+def add_python_object_type(app, name, objtype, directive):
+    """
+    Register an object type on Python domain.
+
+    Components are registered on application registry, so they are copied to each domain
+    instance instead of mutating :class:`sphinx.domains.python.PythonDomain` class.
+    """
+    app.registry.domain_object_types.setdefault('py', {})[name] = objtype
+    app.add_directive_to_domain('py', name, directive, override=True)
+    app.add_role_to_domain('py', name, sphinx.domains.python.PyXRefRole(), override=True)
 
 
 def setup(app):
@@ -331,11 +570,14 @@ def setup(app):
 
     app.add_config_value('dirty_model_add_classes_to_toc', True, True)
     app.add_config_value('dirty_model_add_attributes_to_toc', True, True)
+    app.add_config_value('dirty_model_toc_max_attributes', 0, True)
+    app.add_config_value('dirty_model_toc_max_depth', 0, True)
     app.add_config_value('dirty_model_class_label', 'Model', True)
     app.add_config_value('dirty_model_property_label', 'property', True)
     app.add_config_value('dirty_enum_label', 'enum', True)
 
     app.add_config_value('dirty_model_hide_alias', False, True)
+    app.add_config_value('dirty_model_local_fields', False, True)
 
     app.add_config_value('dirty_model_hide_access_mode', False, True)
     app.add_config_value('dirty_model_hide_access_mode_writable_on_creation', False, True)
@@ -343,34 +585,63 @@ def setup(app):
     app.add_config_value('dirty_model_hide_access_mode_hidden', True, True)
 
     app.add_config_value('dirty_model_structure_expand_enums', True, True)
-
+    app.add_config_value('dirty_model_structure_renderer', 'rest', True, ENUM('rest', 'nodes'))
+    app.add_config_value('dirty_model_structure_max_depth', 0, True)
+    app.add_config_value('dirty_model_structure_max_properties', 0, True)
+    app.add_config_value('dirty_model_structure_cache_size', 128, '')
+
+    app.add_config_value('dirty_model_cache', False, '')
+    app.add_config_value('dirty_model_cache_max_size', 256, '')
+
+    app.add_config_value('dirty_model_stubs', [], '')
+    app.add_config_value('dirty_model_stubs_dir', 'models', '')
+    app.add_config_value('dirty_model_stubs_recursive', True, '')
+    app.add_config_value('dirty_model_stubs_include', [], '')
+    app.add_config_value('dirty_model_stubs_exclude', [], '')
+    app.add_config_value('dirty_model_stubs_options', {}, '')
+
+    app.add_config_value('dirty_model_preload', [], '')
+    app.add_config_value('dirty_model_preload_jobs', 0, '')
+
+    app.add_config_value('dirty_model_profile', False, '')
+    app.add_config_value('dirty_model_profile_top', 10, '')
+
+    app.connect('builder-inited', generate_model_stubs)
+    app.connect('builder-inited', preload_snapshots)
+    app.connect('env-get-outdated', get_outdated_docs)
+    app.connect('env-purge-doc', purge_doc_dependencies)
+    app.connect('env-merge-info', merge_doc_dependencies)
+    app.connect('env-merge-info', merge_profile_data)
+    app.connect('env-merge-info', merge_fragment_stats)
+    app.connect('env-before-read-docs', clear_introspection_cache)
+    app.connect('env-before-read-docs', start_profiling)
+    app.connect('env-before-read-docs', clear_fragment_cache)
+    app.connect('env-updated', clear_reference_index)
+    app.connect('env-updated', log_fragment_stats)
     app.connect('doctree-read', process_dirty_model_toc)
-
-    domain = sphinx.domains.python.PythonDomain
-
-    domain.object_types['dirtymodule'] = sphinx.domains.python.ObjType(_('Module'), 'dirtymodule', 'module')
-    domain.directives['dirtymodule'] = DirtyModuleDirective
-    domain.roles['dirtymodule'] = sphinx.domains.python.PyXRefRole()
-
-    domain.object_types['dirtyenum'] = sphinx.domains.python.ObjType(_('Enum'), 'dirtyenum', 'obj', 'class')
-    domain.directives['dirtyenum'] = DirtyEnumDirective
-    domain.roles['dirtyenum'] = sphinx.domains.python.PyXRefRole()
-
-    domain.object_types['dirtymodel'] = sphinx.domains.python.ObjType(_('Model'), 'dirtymodel', 'obj', 'class')
-    domain.directives['dirtymodel'] = DirtyModelDirective
-    domain.roles['dirtymodel'] = sphinx.domains.python.PyXRefRole()
-
-    domain.object_types['dirtymodelproperty'] = sphinx.domains.python.ObjType(_('Property'), 'dirtymodelproperty',
-                                                                              'obj', 'attr')
-    domain.directives['dirtymodelproperty'] = DirtyModelPropertyDirective
-    domain.roles['dirtymodelproperty'] = sphinx.domains.python.PyXRefRole()
-
-    domain.object_types['dirtymodeladditionalproperties'] = sphinx.domains.python.ObjType(
-        _('Additional properties'),
-        'dirtymodeladditionalproperties',
-        'obj',
-        'attr'
-    )
-
-    domain.directives['dirtymodeladditionalproperties'] = DirtyModelAdditionalPropertiesDirective
-    domain.roles['dirtymodeladditionalproperties'] = sphinx.domains.python.PyXRefRole()
+    app.connect('build-finished', write_profile_report)
+    app.connect('build-finished', prune_documenter_cache)
+
+    add_python_object_type(app, 'dirtymodule', sphinx.domains.python.ObjType(_('Module'), 'dirtymodule', 'module'),
+                           DirtyModuleDirective)
+    add_python_object_type(app, 'dirtyenum', sphinx.domains.python.ObjType(_('Enum'), 'dirtyenum', 'obj', 'class'),
+                           DirtyEnumDirective)
+    add_python_object_type(app, 'dirtymodel', sphinx.domains.python.ObjType(_('Model'), 'dirtymodel', 'obj', 'class'),
+                           DirtyModelDirective)
+    add_python_object_type(app, 'dirtymodelproperty',
+                           sphinx.domains.python.ObjType(_('Property'), 'dirtymodelproperty', 'obj', 'attr'),
+                           DirtyModelPropertyDirective)
+    add_python_object_type(app, 'dirtymodeladditionalproperties',
+                           sphinx.domains.python.ObjType(_('Additional properties'),
+                                                         'dirtymodeladditionalproperties',
+                                                         'obj',
+                                                         'attr'),
+                           DirtyModelAdditionalPropertiesDirective)
+
+    app.add_directive_to_domain('py', 'dirtymodelstructure', DirtyModelStructureDirective)
+
+    app.add_post_transform(DirtyModelReferencesResolver)
+
+    return {'version': __version__,
+            'parallel_read_safe': True,
+            'parallel_write_safe': True}
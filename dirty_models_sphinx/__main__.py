@@ -0,0 +1,31 @@
+"""
+Command line tools of Dirty Models Sphinx extension.
+
+Usage::
+
+    $ python -m dirty_models_sphinx <command> [options]
+"""
+
+import sys
+from importlib import import_module
+
+#: Command name to module which implements it on its ``main`` function
+COMMANDS = {
+    'render': 'dirty_models_sphinx.render',
+    'stubs': 'dirty_models_sphinx.stubs',
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] not in COMMANDS:
+        print('usage: python -m dirty_models_sphinx {{{}}} [options]'.format(','.join(sorted(COMMANDS))),
+              file=sys.stderr)
+        return 2
+
+    return import_module(COMMANDS[argv[0]]).main(argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Persistent cache of generated documentation
+"""
+
+import os
+import pickle
+from hashlib import sha1
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = 'dirty_models_cache'
+
+RECORDER_KEY = 'dirty_models:cache_recorder'
+
+CONTEXT_KEYS = ('autodoc:module', 'autodoc:class')
+
+AUTODOC_EVENTS = ('autodoc-before-process-signature', 'autodoc-process-signature', 'autodoc-process-docstring',
+                  'autodoc-process-bases', 'autodoc-skip-member')
+
+
+class CacheRecorder:
+    """
+    Records what a documenter uses while it generates content, so it could be stored
+    on cache.
+    """
+
+    def __init__(self):
+        #: Classes rendered (models, their ancestors and enumerations)
+        self.classes = set()
+        #: List of ``(result index, key)`` of structures rendered as nodes
+        self.structures = []
+
+
+class CacheEntry:
+    """
+    Content generated by a documenter.
+    """
+
+    def __init__(self, lines, dependencies, files, structures, context, expansions):
+        #: List of ``(line, source, offset)``
+        self.lines = lines
+        #: Dictionary of ``(module, qualname)`` to ``(filename, mtime, digest)``
+        self.dependencies = dependencies
+        #: Files recorded as document dependencies
+        self.files = files
+        #: List of ``(line index, properties)`` of structures rendered as nodes
+        self.structures = structures
+        #: ``autodoc`` context left on build environment after generation
+        self.context = context
+        #: List of ``((module, qualname), title, label)`` of models expanded as structure
+        self.expansions = expansions
+
+
+class DocumenterCache:
+    """
+    Content addressed cache of documenter output stored on build directory.
+    Each entry is a pickle file named by its key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_filename(self, key):
+        return os.path.join(self.path, key + '.pickle')
+
+    def load(self, key):
+        filename = self.get_filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logger.debug('[dirty_models_sphinx] cache entry %s could not be loaded: %s', key, ex)
+            return None
+
+        try:
+            os.utime(filename)  # Modification time is time of last use, see prune()
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key, entry):
+        filename = self.get_filename(key)
+        tmp_filename = '{}.{}'.format(filename, os.getpid())
+
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_filename, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_filename, filename)
+        except Exception as ex:
+            logger.debug('[dirty_models_sphinx] cache entry %s could not be stored: %s', key, ex)
+
+    def prune(self, max_size):
+        """
+        Removes least recently used entries, so cache takes ``max_size`` bytes at most.
+        It returns number of entries removed.
+        """
+        try:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(self.path) if entry.is_file()]
+        except FileNotFoundError:
+            return 0
+
+        size = 0
+        removed = 0
+        for mtime, file_size, filename in sorted(files, reverse=True):
+            size += file_size
+            if size <= max_size:
+                continue
+
+            try:
+                os.remove(filename)
+            except OSError as ex:
+                logger.debug('[dirty_models_sphinx] cache file %s could not be removed: %s', filename, ex)
+            else:
+                removed += 1
+
+        return removed
+
+
+def get_documenter_cache(app):
+    """
+    Returns documenter cache of Sphinx application or ``None`` if it is disabled.
+    """
+    if not app.config.dirty_model_cache:
+        return None
+
+    try:
+        return app.dirty_models_documenter_cache
+    except AttributeError:
+        cache = app.dirty_models_documenter_cache = DocumenterCache(os.path.join(app.doctreedir, CACHE_DIRNAME))
+        return cache
+
+
+def prune_documenter_cache(app, exception):
+    """
+    Removes least recently used entries of documenter cache when it is bigger than
+    ``dirty_model_cache_max_size`` megabytes. It is connected to ``build-finished``.
+    """
+    cache = get_documenter_cache(app)
+    if cache is None or exception is not None or not app.config.dirty_model_cache_max_size:
+        return
+
+    removed = cache.prune(app.config.dirty_model_cache_max_size * 1024 * 1024)
+    if removed:
+        logger.info('[dirty_models_sphinx] %d entries removed from documenter cache', removed)
+
+
+def get_cache_recorder(env):
+    """
+    Returns recorder of documenter which is generating content to be cached, if any.
+    """
+    return env.temp_data.get(RECORDER_KEY)
+
+
+def stable_repr(value):
+    """
+    Returns a representation of value which does not change between processes.
+    """
+    if isinstance(value, (set, frozenset)):
+        return repr(sorted(stable_repr(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return repr([stable_repr(v) for v in value])
+    if isinstance(value, dict):
+        return repr(sorted((stable_repr(k), stable_repr(v)) for k, v in value.items()))
+    if isinstance(value, type) or callable(value):
+        return '{}.{}'.format(getattr(value, '__module__', ''),
+                              getattr(value, '__qualname__', type(value).__qualname__))
+    if type(value).__repr__ is object.__repr__:
+        return type(value).__qualname__
+    return repr(value)
+
+
+def get_config_digest(app):
+    """
+    Returns a digest of configuration values which require to read documents again when they
+    change, of every extension (``napoleon_*`` or ``rst_prolog`` change docstrings too).
+    It is computed once per application.
+    """
+    try:
+        return app.dirty_models_config_digest
+    except AttributeError:
+        pass
+
+    # Extension values are registered with rebuild ``True``, which means ``'env'``
+    config = app.config
+    values = {name: getattr(config, name) for name, value in config.values.items()
+              if value[1] == 'env' or value[1] is True}
+    digest = app.dirty_models_config_digest = sha1(stable_repr(values).encode()).hexdigest()
+    return digest
+
+
+def get_cache_key(documenter, fingerprint, args):
+    """
+    Returns cache key of documenter content. It is computed from extension version,
+    model fingerprint, documenter name and options, document context, configuration
+    values which require rebuild and ``autodoc`` event listeners.
+    """
+    from . import __version__
+
+    env = documenter.env
+
+    items = [__version__,
+             fingerprint,
+             stable_repr(type(documenter)),
+             documenter.name,
+             documenter.indent,
+             env.docname,
+             env.ref_context.get('py:module'),
+             env.ref_context.get('py:class'),
+             [env.temp_data.get(k) for k in CONTEXT_KEYS],
+             stable_repr(dict(documenter.options)),
+             stable_repr(list(args)),
+             get_config_digest(env.app),
+             stable_repr({event: [listener.handler for listener in env.app.events.listeners.get(event, [])]
+                          for event in AUTODOC_EVENTS})]
+
+    return sha1(repr(items).encode()).hexdigest()
@@ -0,0 +1,251 @@
+"""
+Model dependency tracking for incremental builds
+"""
+
+import ast
+import inspect
+import linecache
+import os
+from hashlib import sha1
+from importlib import import_module
+
+from sphinx.util import logging
+
+from .cache import get_cache_recorder
+from .introspection import get_introspection_cache
+
+logger = logging.getLogger(__name__)
+
+IGNORED_PACKAGES = ('builtins', 'enum', 'dirty_models')
+
+
+def get_documents_dependencies(env):
+    """
+    Returns classes rendered on each document. It is a dictionary where keys are document names
+    and values are dictionaries of ``(module, qualname)`` to ``(filename, mtime, digest)``.
+    """
+    try:
+        return env.dirty_models_dependencies
+    except AttributeError:
+        dependencies = env.dirty_models_dependencies = {}
+        return dependencies
+
+
+def get_source_file(cls):
+    try:
+        return inspect.getsourcefile(cls)
+    except TypeError:
+        return None
+
+
+def get_source_digest(app, cls):
+    """
+    Returns a digest of class source code. It is computed once per class and build.
+    """
+    digests = get_introspection_cache(app).source_digests
+    try:
+        return digests[cls]
+    except KeyError:
+        pass
+
+    try:
+        digest = sha1(get_class_source(app, cls).encode()).hexdigest()
+    except (OSError, TypeError):
+        digest = None
+
+    digests[cls] = digest
+    return digest
+
+
+def get_class_source(app, cls):
+    """
+    Returns class source code. Source file is parsed just once per build to find
+    all its classes, instead of parsing it for each class.
+    """
+    filename = get_source_file(cls)
+    if filename is None:
+        raise TypeError('{!r} has no source file'.format(cls))
+
+    ranges = get_introspection_cache(app).class_ranges
+    try:
+        file_ranges = ranges[filename]
+    except KeyError:
+        file_ranges = ranges[filename] = find_class_ranges(linecache.getlines(filename))
+
+    try:
+        start, end = file_ranges[cls.__qualname__]
+    except KeyError:
+        return inspect.getsource(cls)
+
+    return ''.join(linecache.getlines(filename)[start - 1:end])
+
+
+class ClassRangeFinder(ast.NodeVisitor):
+    """
+    Finds first and last line of each class definition by qualified name.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.ranges = {}
+
+    def visit_FunctionDef(self, node):
+        self.stack.extend((node.name, '<locals>'))
+        self.generic_visit(node)
+        del self.stack[-2:]
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.stack.append(node.name)
+        start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        self.ranges.setdefault('.'.join(self.stack), (start, node.end_lineno))
+        self.generic_visit(node)
+        self.stack.pop()
+
+
+def find_class_ranges(lines):
+    finder = ClassRangeFinder()
+    try:
+        finder.visit(ast.parse(''.join(lines)))
+    except (SyntaxError, ValueError):
+        pass
+    return finder.ranges
+
+
+def iter_class_hierarchy(cls):
+    """
+    Yields class and its ancestors defined out of Python and Dirty Models packages.
+    """
+    for klass in cls.__mro__:
+        if klass.__module__.split('.')[0] in IGNORED_PACKAGES:
+            continue
+        yield klass
+
+
+def note_class_dependency(env, cls):
+    """
+    Records a model or enumeration class as rendered on current document.
+    Model class ancestors are recorded too because they contribute fields.
+    """
+    if env.docname is None:
+        return
+
+    if not isinstance(cls, type):
+        cls = type(cls)
+
+    dependencies = get_documents_dependencies(env).setdefault(env.docname, {})
+    recorder = get_cache_recorder(env)
+
+    for klass in iter_class_hierarchy(cls):
+        if recorder is not None:
+            recorder.classes.add(klass)
+
+        key = (klass.__module__, klass.__qualname__)
+        if key in dependencies:
+            continue
+
+        dependency = get_class_dependency(env.app, klass)
+        if dependency is not None:
+            dependencies[key] = dependency
+
+
+def get_class_dependency(app, cls):
+    """
+    Returns ``(filename, mtime, digest)`` of a class. Classes without source code
+    are tracked by their structural fingerprint, so filename and mtime are ``None``.
+    Classes defined on functions without source code could not be tracked,
+    so ``None`` is returned.
+    """
+    filename = get_source_file(cls)
+    try:
+        mtime = os.path.getmtime(filename)
+    except (OSError, TypeError):
+        filename = mtime = None
+    else:
+        digest = get_source_digest(app, cls)
+        if digest is not None:
+            return filename, mtime, digest
+
+    if '<locals>' in cls.__qualname__:
+        return None
+
+    from .fingerprints import get_fingerprint
+
+    return None, None, get_fingerprint(app, cls)
+
+
+def import_class(modname, qualname):
+    obj = import_module(modname)
+    for attrname in qualname.split('.'):
+        obj = getattr(obj, attrname)
+    return obj
+
+
+def is_class_changed(app, key, filename, mtime, digest):
+    if filename is None:
+        from .fingerprints import get_fingerprint
+
+        try:
+            return get_fingerprint(app, import_class(*key)) != digest
+        except Exception:
+            return True
+
+    try:
+        if os.path.getmtime(filename) == mtime:
+            return False
+    except OSError:
+        return True
+
+    linecache.checkcache(filename)
+
+    if digest is None or '<locals>' in key[1]:
+        return True
+
+    try:
+        cls = import_class(*key)
+    except Exception:
+        return True
+
+    return get_source_digest(app, cls) != digest
+
+
+def get_outdated_docs(app, env, added, changed, removed):
+    """
+    Returns documents which render a model or enumeration whose source has changed.
+    It is connected to ``env-get-outdated``.
+    """
+    changed_classes = {}
+    outdated = []
+
+    for docname, dependencies in get_documents_dependencies(env).items():
+        if docname in added or docname in changed or docname in removed:
+            continue
+
+        for key, (filename, mtime, digest) in dependencies.items():
+            try:
+                is_changed = changed_classes[(key, mtime, digest)]
+            except KeyError:
+                is_changed = changed_classes[(key, mtime, digest)] = is_class_changed(app, key, filename,
+                                                                                      mtime, digest)
+
+            if is_changed:
+                logger.debug('[dirty_models_sphinx] %s is outdated: %s.%s changed', docname, *key)
+                outdated.append(docname)
+                break
+
+    return outdated
+
+
+def purge_doc_dependencies(app, env, docname):
+    get_documents_dependencies(env).pop(docname, None)
+
+
+def merge_doc_dependencies(app, env, docnames, other):
+    dependencies = get_documents_dependencies(env)
+    other_dependencies = get_documents_dependencies(other)
+    for docname in docnames:
+        try:
+            dependencies[docname] = other_dependencies[docname]
+        except KeyError:
+            pass
@@ -0,0 +1,120 @@
+"""
+Discovery of models and enumerations
+"""
+
+import pkgutil
+from enum import Enum
+from fnmatch import fnmatchcase
+from importlib import import_module
+
+from sphinx.util import logging
+
+from .introspection import is_model_class
+
+logger = logging.getLogger(__name__)
+
+
+def patterns_option(arg):
+    """
+    Directive option of comma separated ``fnmatch`` patterns.
+    """
+    if arg is None:
+        return []
+    return [pattern.strip() for pattern in arg.split(',') if pattern.strip()]
+
+
+def is_private_name(name):
+    return any(part.startswith('_') for part in name.split('.'))
+
+
+def is_path_included(path, include=None, exclude=None):
+    """
+    Whether a dotted path matches any ``include`` pattern (all paths are included if
+    there are no patterns) and none of ``exclude`` patterns.
+    """
+    if include and not any(fnmatchcase(path, pattern) for pattern in include):
+        return False
+
+    return not any(fnmatchcase(path, pattern) for pattern in exclude or [])
+
+
+def iter_module_names(module, recursive=False, private=False):
+    """
+    Yields name of module and, if ``recursive``, names of all its submodules sorted by name.
+    Subpackages are imported in order to find their submodules, but modules are not.
+    """
+    yield module.__name__
+
+    if not recursive or not hasattr(module, '__path__'):
+        return
+
+    def onerror(name):
+        logger.warning('[dirty_models_sphinx] failed to import package %s', name, type='autodoc')
+
+    names = sorted(info.name for info in pkgutil.walk_packages(module.__path__, module.__name__ + '.',
+                                                               onerror=onerror))
+
+    for name in names:
+        if not private and is_private_name(name[len(module.__name__) + 1:]):
+            continue
+
+        yield name
+
+
+def iter_modules(module, recursive=False, private=False):
+    """
+    Yields module and, if ``recursive``, all its submodules sorted by name. Each module
+    is imported just once. Modules which could not be imported are skipped with a warning.
+    """
+    for name in iter_module_names(module, recursive=recursive, private=private):
+        if name == module.__name__:
+            yield module
+            continue
+
+        try:
+            yield import_module(name)
+        except Exception as ex:
+            logger.warning('[dirty_models_sphinx] failed to import module %s: %s', name, ex, type='autodoc')
+
+
+def discover_module_classes(mod, include=None, exclude=None, private=False):
+    """
+    Returns models and enumerations defined on a module as a list of ``(module name, class name, class)``
+    sorted by class name.
+    """
+    result = []
+
+    for name, obj in list(vars(mod).items()):
+        if not isinstance(obj, type) or obj.__module__ != mod.__name__ or obj.__qualname__ != name:
+            continue
+
+        if not is_model_class(obj) and not issubclass(obj, Enum):
+            continue
+
+        if not private and is_private_name(name):
+            continue
+
+        if not is_path_included('{}.{}'.format(mod.__name__, name), include, exclude):
+            continue
+
+        result.append((mod.__name__, name, obj))
+
+    result.sort(key=lambda item: item[1])
+    return result
+
+
+def discover_classes(module, recursive=False, include=None, exclude=None, private=False):
+    """
+    Returns models and enumerations defined on a module (and its submodules, if ``recursive``)
+    as a list of ``(module name, class name, class)`` sorted by module name and class name.
+
+    Classes are filtered using ``fnmatch`` patterns on their dotted paths. Imported classes
+    and aliases are ignored, so each class is found once, on the module where it is defined.
+    """
+    result = []
+
+    for mod in iter_modules(module, recursive=recursive, private=private):
+        result.extend(discover_module_classes(mod, include=include, exclude=exclude, private=private))
+
+    result.sort(key=lambda item: item[:2])
+    return result
@@ -2,30 +2,30 @@
 Auto Documenters
 """
 
-from enum import Enum, IntEnum
+from enum import Enum
 from inspect import getdoc
-from logging import getLogger
 from typing import Any, Optional
 
 import sphinx.ext.autodoc
 import sphinx.roles
-from dirty_models.fields import (ArrayField, BlobField, BooleanField, DateField, DateTimeField, EnumField,
-                                 FloatField, HashMapField, IntegerField, ModelField, MultiTypeField, StringField,
-                                 StringIdField, TimeField, TimedeltaField)
-from dirty_models.models import BaseField, BaseModel
-from dirty_models.utils import factory
+from docutils import nodes
+from docutils.parsers.rst import directives
+from sphinx.util import logging
 from sphinx.util.docstrings import prepare_docstring
 
-try:
-    from dirty_models import AccessMode
-except ImportError:
-    class AccessMode(IntEnum):
-        READ_AND_WRITE = 0
-        WRITABLE_ONLY_ON_CREATION = 1
-        READ_ONLY = 2
-        HIDDEN = 3
+from .cache import (CONTEXT_KEYS, RECORDER_KEY, CacheEntry, CacheRecorder, get_cache_key, get_cache_recorder,
+                    get_documenter_cache, stable_repr)
+from .dependencies import (get_class_dependency, get_source_digest, import_class, is_class_changed,
+                           note_class_dependency)
+from .discovery import discover_classes, patterns_option
+from .fragments import StructureFragment, get_fragment_cache, note_fragment_lookup
+# ``AccessMode`` is resolved lazily, so Dirty Models is not imported with extension
+from .introspection import __getattr__  # noqa: F401
+from .introspection import get_field_access_mode, get_model_info, is_field, is_model, is_model_class
+from .profiling import get_class_path, profile
+
+logger = logging.getLogger(__name__)
 
-logger = getLogger(__name__)
 
 common_options_spec = {
     'as-structure': sphinx.ext.autodoc.bool_option,
@@ -34,14 +34,21 @@ common_options_spec = {
     'hide-access-mode-read-only': sphinx.ext.autodoc.bool_option,
     'hide-access-mode-hidden': sphinx.ext.autodoc.bool_option,
     'hide-alias': sphinx.ext.autodoc.bool_option,
+    'local-fields': sphinx.ext.autodoc.bool_option,
+    'all-fields': sphinx.ext.autodoc.bool_option,
     'show-access-mode': sphinx.ext.autodoc.bool_option,
     'show-access-mode-writable-on-creation': sphinx.ext.autodoc.bool_option,
     'show-access-mode-read-only': sphinx.ext.autodoc.bool_option,
     'show-access-mode-hidden': sphinx.ext.autodoc.bool_option,
     'show-alias': sphinx.ext.autodoc.bool_option,
-    'struct-expand-enums': sphinx.ext.autodoc.bool_option
+    'struct-expand-enums': sphinx.ext.autodoc.bool_option,
+    'struct-max-depth': directives.nonnegative_int,
+    'struct-max-properties': directives.nonnegative_int
 }
 
+#: Options which structures depend on
+structure_options = tuple(sorted(common_options_spec)) + ('noindex',)
+
 
 class DirtyModuleDocumenter(sphinx.ext.autodoc.ModuleDocumenter):
     """
@@ -55,6 +62,9 @@ class DirtyModuleDocumenter(sphinx.ext.autodoc.ModuleDocumenter):
 
     option_spec = {
         **sphinx.ext.autodoc.ModuleDocumenter.option_spec,
+        'recursive': sphinx.ext.autodoc.bool_option,
+        'include': patterns_option,
+        'exclude': patterns_option,
         **common_options_spec
     }
 
@@ -64,6 +74,37 @@ class DirtyModuleDocumenter(sphinx.ext.autodoc.ModuleDocumenter):
         if 'as-structure' in self.options:
             self.options['noindex'] = True
 
+    def generate(self, *args, **kwargs):
+        with profile('rest', get_object_name(self.name)):
+            super(DirtyModuleDocumenter, self).generate(*args, **kwargs)
+
+    def is_discovery_enabled(self):
+        return any(option in self.options for option in ('recursive', 'include', 'exclude'))
+
+    def document_members(self, all_members=False):
+        """
+        Document members. When ``recursive``, ``include`` or ``exclude`` options are used,
+        models and enumerations are discovered walking module (and submodules) just once,
+        and documented sorted by module and name.
+        """
+        if not self.is_discovery_enabled():
+            super(DirtyModuleDocumenter, self).document_members(all_members)
+            return
+
+        self.env.temp_data['autodoc:module'] = self.modname
+
+        for modname, name, cls in discover_classes(self.object,
+                                                   recursive=self.options.get('recursive', False),
+                                                   include=self.options.get('include'),
+                                                   exclude=self.options.get('exclude'),
+                                                   private=bool(self.options.get('private-members'))):
+            documenter_class = DirtyModelDocumenter if is_model_class(cls) else DirtyEnumDocumenter
+            documenter = documenter_class(self.directive, '{}::{}'.format(modname, name), self.indent)
+            documenter.generate(all_members=True, real_modname=modname)
+
+        self.env.temp_data['autodoc:module'] = None
+        self.env.temp_data['autodoc:class'] = None
+
 
 class DirtyEnumDocumenter(sphinx.ext.autodoc.ClassDocumenter, sphinx.ext.autodoc.ClassLevelDocumenter):
     """
@@ -83,6 +124,180 @@ class DirtyEnumDocumenter(sphinx.ext.autodoc.ClassDocumenter, sphinx.ext.autodoc
         except TypeError:
             return False
 
+    def generate(self, *args, **kwargs):
+        with profile('rest', get_object_name(self.name)):
+            super(DirtyEnumDocumenter, self).generate(*args, **kwargs)
+
+
+def get_object_name(name):
+    """
+    Returns object name given to a documenter as dotted path. Autodoc uses ``module::object``
+    names for members.
+    """
+    return name.replace('::', '.')
+
+
+def note_structure(env, properties):
+    """
+    Stores structure properties on current document, so they could be rendered
+    by ``dirtymodelstructure`` directive. It returns structure key.
+    """
+    structures = env.temp_data.setdefault('dirty_models:structures', {})
+    key = str(len(structures))
+    while key in structures:
+        key += '_'
+    structures[key] = properties
+    return key
+
+
+def generate_cached(documenter, generate, *args):
+    """
+    Generates documenter content using persistent cache, if it is enabled (``dirty_model_cache``).
+    Content is generated calling ``generate`` on cache miss. Documenters used by a cached one
+    are not cached by themselves.
+    """
+    env = documenter.env
+    cache = get_documenter_cache(env.app)
+    if cache is None or env.docname is None or get_cache_recorder(env) is not None \
+            or get_structure_budget(documenter).is_limited():
+        # Content bounded by a structure budget depends on what directive documented before
+        generate(*args)
+        return
+
+    with profile('cache'):
+        key = get_documenter_cache_key(documenter, args)
+        entry = cache.load(key) if key is not None else None
+
+        if entry is not None and not any(is_class_changed(env.app, k, *dependency)
+                                         for k, dependency in entry.dependencies.items()):
+            replay_cache_entry(documenter, entry)
+            return
+
+    entry = record_cache_entry(documenter, generate, args)
+
+    if key is not None and entry is not None:
+        with profile('cache'):
+            cache.store(key, entry)
+
+
+class ResolvedOnceMixin:
+    """
+    Documenter whose name and object are resolved just once. Persistent cache resolves them
+    to compute cache key, so they are not resolved again when content is generated.
+    """
+
+    resolved = False
+
+    def parse_name(self):
+        if self.resolved:
+            return True
+        return super(ResolvedOnceMixin, self).parse_name()
+
+    def import_object(self, raiseerror=False):
+        if self.resolved:
+            return True
+        return super(ResolvedOnceMixin, self).import_object(raiseerror)
+
+
+def get_documenter_cache_key(documenter, args):
+    try:
+        if not documenter.parse_name() or not documenter.import_object(raiseerror=True):
+            return None
+    except ImportError:
+        return None
+    documenter.resolved = True
+
+    cls = documenter.object if isinstance(documenter.object, type) else documenter.parent
+    if not is_model_class(cls):
+        return None
+
+    from .fingerprints import get_fingerprint
+
+    # Source digest covers members which are not fields, like methods. Structures link
+    # to models already expanded by directive
+    app = documenter.env.app
+    return get_cache_key(documenter, [get_fingerprint(app, cls), get_source_digest(app, cls),
+                                      stable_repr(get_structure_expansions(documenter))], args)
+
+
+def record_cache_entry(documenter, generate, args):
+    """
+    Generates documenter content and returns it as :class:`~dirty_models_sphinx.cache.CacheEntry`.
+    It returns ``None`` if content could not be cached.
+    """
+    env = documenter.env
+    directive = documenter.directive
+    recorder = env.temp_data[RECORDER_KEY] = CacheRecorder()
+    expansions = get_structure_expansions(documenter)
+    previous_expansions = set(expansions)
+    record_dependencies = directive.record_dependencies
+    directive.record_dependencies = files = set()
+    start = len(directive.result)
+
+    try:
+        generate(*args)
+    finally:
+        del env.temp_data[RECORDER_KEY]
+        directive.record_dependencies = record_dependencies
+        record_dependencies.update(files)
+
+    dependencies = {}
+    for cls in recorder.classes:
+        dependency = get_class_dependency(env.app, cls)
+        if dependency is None or '<locals>' in cls.__qualname__:
+            return None
+        dependencies[(cls.__module__, cls.__qualname__)] = dependency
+
+    lines = [(line, source, offset)
+             for line, (source, offset) in zip(directive.result.data[start:], directive.result.items[start:])]
+    structures = [(index - start, env.temp_data['dirty_models:structures'][key])
+                  for index, key in recorder.structures]
+
+    context = {k: env.temp_data.get(k) for k in CONTEXT_KEYS}
+
+    new_expansions = [((model.__module__, model.__qualname__), title, label)
+                      for model, (title, label) in expansions.items() if model not in previous_expansions]
+
+    return CacheEntry(lines, dependencies, files, structures, context, new_expansions)
+
+
+def replay_cache_entry(documenter, entry):
+    """
+    Adds cached content to directive result.
+    """
+    env = documenter.env
+    lines = list(entry.lines)
+
+    for index, properties in entry.structures:
+        line, source, offset = lines[index]
+        lines[index] = (line[:line.rindex(' ') + 1] + note_structure(env, properties), source, offset)
+
+    for line, source, offset in lines:
+        documenter.directive.result.append(line, source, offset)
+
+    documenter.directive.record_dependencies.update(entry.files)
+    env.temp_data.update(entry.context)
+
+    expansions = get_structure_expansions(documenter)
+    for (module, qualname), title, label in entry.expansions:
+        expansions[import_class(module, qualname)] = (title, label)
+
+    for module, qualname in entry.dependencies:
+        note_class_dependency(env, import_class(module, qualname))
+
+
+#: Access mode name to option which hides it
+hide_access_mode_options = {'WRITABLE_ONLY_ON_CREATION': 'hide-access-mode-writable-on-creation',
+                            'READ_ONLY': 'hide-access-mode-read-only',
+                            'HIDDEN': 'hide-access-mode-hidden'}
+
+
+def get_hidden_access_modes(options):
+    """
+    Returns a frozenset of names of access modes hidden by documenter options.
+    """
+    return frozenset(name for name, option in hide_access_mode_options.items() if options.get(option, False))
+
 
 def merge_options(options, config):
     if 'hide-alias' not in options:
@@ -118,8 +333,20 @@ def merge_options(options, config):
     if 'struct-expand-enums' not in options:
         options['struct-expand-enums'] = config.dirty_model_structure_expand_enums
 
+    if 'struct-max-depth' not in options:
+        options['struct-max-depth'] = config.dirty_model_structure_max_depth
+
+    if 'struct-max-properties' not in options:
+        options['struct-max-properties'] = config.dirty_model_structure_max_properties
+
+    if 'local-fields' not in options:
+        options['local-fields'] = config.dirty_model_local_fields
 
-class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
+    if 'all-fields' in options:
+        options['local-fields'] = False
+
+
+class DirtyModelDocumenter(ResolvedOnceMixin, sphinx.ext.autodoc.ClassDocumenter):
     """
     A Documenter for :class:`dirty_models.models.BaseModel`.
     """
@@ -139,20 +366,24 @@ class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
         super().__init__(*args)
 
         merge_options(self.options, self.env.app.config)
+        self.hidden_access_modes = get_hidden_access_modes(self.options)
 
         if self.options.title:
             self.options.noindex = True
 
     @classmethod
     def can_document_member(cls, member: Any, membername: str, isattr: bool, parent: Any) -> bool:
-        try:
-            return issubclass(member, BaseModel)
-        except TypeError:
-            return isinstance(member, BaseModel)
+        return is_model(member)
 
     def format_args(self, **kwargs: Any) -> Optional[str]:
         return None
 
+    def generate(self, more_content=None, real_modname=None,
+                 check_module=False, all_members=False):
+        with profile('rest', get_object_name(self.name)):
+            generate_cached(self, super(DirtyModelDocumenter, self).generate,
+                            more_content, real_modname, check_module, all_members)
+
     def add_directive_header(self, sig: str) -> None:
         """
         Add the directive header and options to the generated content
@@ -164,30 +395,23 @@ class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
         if self.options.title:
             self.add_line('   :title: %s' % self.options.title, sourcename)
 
+    def get_model_info(self):
+        return get_model_info(self.env, self.object)
+
     def get_member_access_mode(self, member):
         try:
-            return self.object.__override_field_access_modes__[member.name]
-        except (AttributeError, KeyError):
-            try:
-                if member.read_only:
-                    return AccessMode.READ_ONLY
-            except AttributeError:
-                try:
-                    return member.access_mode
-                except AttributeError:
-                    pass
-
-        return AccessMode.READ_AND_WRITE
+            return self.get_model_info().access_modes[member.name]
+        except KeyError:
+            return get_field_access_mode(self.object, member)
 
     def must_show_member(self, member) -> bool:
-        options = {AccessMode.WRITABLE_ONLY_ON_CREATION: 'hide-access-mode-writable-on-creation',
-                   AccessMode.READ_ONLY: 'hide-access-mode-read-only',
-                   AccessMode.HIDDEN: 'hide-access-mode-hidden'}
+        return self.get_member_access_mode(member).name not in self.hidden_access_modes
 
-        try:
-            return not self.options.get(options[self.get_member_access_mode(member)], False)
-        except KeyError:
-            return True
+    def get_shown_structure(self):
+        """
+        Returns structure fields to document, filtered by hidden access modes.
+        """
+        return self.get_model_info().get_shown_structure(self.hidden_access_modes)
 
     def get_object_members(self, want_all):
         members_check_module, members = super(DirtyModelDocumenter, self).get_object_members(True)
@@ -196,29 +420,59 @@ class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
 
         if 'as-structure' not in self.options:
             for name, member in members:
-                if not isinstance(member, BaseField):
+                if not is_field(member):
                     new_members.append((name, member))
 
-        for field_name, member in self.object.get_structure().items():
-            if not self.must_show_member(member):
-                continue
+        model_info = self.get_model_info()
+        note_class_dependency(self.env, self.object)
 
-            if member.metadata is not None and member.metadata.get('hidden', False):
-                continue
+        local_fields = self.is_local_fields_enabled()
 
-            try:
-                member.default = self.object.get_default_data()[field_name]
-            except KeyError:
-                pass
+        for field_name, member in self.get_shown_structure().items():
+            if local_fields and model_info.field_owners[field_name] is not self.object:
+                continue
 
-            try:
-                member.access_mode = self.get_member_access_mode(member)
-            except KeyError:
-                pass
             new_members.append((field_name, member))
 
         return members_check_module, new_members
 
+    def is_local_fields_enabled(self):
+        return self.options.get('local-fields', False) and not self.options.get('as-structure', False)
+
+    def get_inherited_fields(self):
+        """
+        Returns a list of ``(class, field names)`` of visible fields inherited from ancestors,
+        sorted by model MRO. Field names are sorted like members.
+        """
+        model_info = self.get_model_info()
+
+        inherited = {}
+        for field_name in self.get_shown_structure():
+            owner = model_info.field_owners[field_name]
+            if owner is self.object:
+                continue
+
+            inherited.setdefault(owner, []).append(field_name)
+
+        if (self.options.member_order or self.config.autodoc_member_order) == 'alphabetical':
+            for field_names in inherited.values():
+                field_names.sort()
+
+        return [(klass, inherited[klass]) for klass in self.object.__mro__ if klass in inherited]
+
+    def add_inherited_fields(self):
+        """
+        Add a compact block of cross references to inherited fields.
+        """
+        sourcename = self.get_sourcename()
+        for klass, field_names in self.get_inherited_fields():
+            path = get_class_path(klass)
+            self.add_line('', sourcename)
+            self.add_line('   Inherited from :py:class:`~{}`: {}'.format(
+                path,
+                ', '.join(':py:attr:`~{}.{}`'.format(path, field_name) for field_name in field_names)),
+                sourcename)
+
     def document_members(self, all_members: bool = False) -> None:
         """Generate reST for member documentation.
 
@@ -226,8 +480,19 @@ class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
         *self.options.members*.
         """
         # set current namespace for finding members
+        budget = get_structure_budget(self)
+        skipped = budget.skipped
         super(DirtyModelDocumenter, self).document_members(all_members=all_members)
 
+        if budget.skipped > skipped:
+            sourcename = self.get_sourcename()
+            self.add_line('', sourcename)
+            self.add_line('Structure truncated, described at :py:class:`~{}`.'.format(get_class_path(self.object)),
+                          sourcename)
+
+        if self.is_local_fields_enabled():
+            self.add_inherited_fields()
+
         if not hasattr(self.object, '__field_type__') or not self.object.__field_type__:
             return
 
@@ -244,6 +509,12 @@ class DirtyModelDocumenter(sphinx.ext.autodoc.ClassDocumenter):
         self.env.temp_data['autodoc:class'] = None
 
 
+access_mode_names = {'READ_AND_WRITE': 'read-and-write',
+                     'WRITABLE_ONLY_ON_CREATION': 'writable-only-on-creation',
+                     'READ_ONLY': 'read-only',
+                     'HIDDEN': 'hidden'}
+
+
 def field_format(parse_format):
     if isinstance(parse_format, str):
         return '``{}``'.format(parse_format)
@@ -263,7 +534,33 @@ def field_format(parse_format):
                                                         parse_format.__qualname__)
 
 
-class DirtyModelPropertyDocumenter(sphinx.ext.autodoc.AttributeDocumenter):
+def get_default_value_fields(field_spec, default=None, as_structure=False, formatted=True):
+    """
+    Returns default value field of a field as a list of ``(name, value)`` items. Default value
+    is ``field_spec`` default if ``default`` is ``None``.
+    """
+    from dirty_models.utils import factory
+
+    if default is None:
+        default = field_spec.default
+    if default is None:
+        return []
+    if isinstance(default, factory):
+        default = default()
+
+    if formatted:
+        default = field_spec.get_formatted_value(default)
+
+    if isinstance(default, Enum):
+        if as_structure:
+            default = default.value
+        else:
+            default = ':py:attr:`{0}.{1}`'.format(default.__class__.__qualname__,
+                                                  default.name)
+    return [('default', '{0}'.format(default))]
+
+
+class DirtyModelPropertyDocumenter(ResolvedOnceMixin, sphinx.ext.autodoc.AttributeDocumenter):
     """
     A Documenter for :class:`dirty_models.fields.BaseField`
     interface attributes.
@@ -286,95 +583,152 @@ class DirtyModelPropertyDocumenter(sphinx.ext.autodoc.AttributeDocumenter):
 
     @classmethod
     def can_document_member(cls, member, membername, isattr, parent):
-        return isinstance(member, BaseField)
+        return is_field(member)
 
     def get_inner_field(self, field_spec, lst=0):
+        from dirty_models.fields import ArrayField
+
         if isinstance(field_spec, ArrayField):
             return self.get_inner_field(field_spec.field_type, lst + 1)
         return field_spec, lst
 
+    def get_parent_model_info(self):
+        """
+        Returns introspected data of model which owns documented field, if any.
+        """
+        if not is_model_class(self.parent):
+            return None
+
+        model_info = get_model_info(self.env, self.parent)
+        if self.objpath[-1] not in model_info.structure:
+            return None
+        return model_info
+
+    def get_field_view(self):
+        """
+        Returns :class:`~dirty_models_sphinx.introspection.FieldView` of documented field,
+        if it belongs to a model.
+        """
+        model_info = self.get_parent_model_info()
+        if model_info is None:
+            return None
+        return model_info.get_field_view(self.objpath[-1])
+
+    def is_view_of(self, view, field_spec):
+        """
+        Whether a field view describes a field. Documented field is looked up on model class,
+        so it could be the field of an ancestor, which is copied to model structure.
+        """
+        return view is not None and (view.field is field_spec or field_spec is self.object)
+
+    def get_field_access_mode(self):
+        view = self.get_field_view()
+        if view is None:
+            return get_field_access_mode(None, self.object)
+        return view.access_mode
+
+    def get_field_default(self):
+        view = self.get_field_view()
+        if view is None:
+            return self.object.default
+        return view.default
+
+    def get_structure_model(self, field_spec=None):
+        """
+        Returns model class which is expanded on structure, if any.
+        """
+        from dirty_models.fields import ModelField
+
+        if not self.options.get('as-structure', False):
+            return None
+
+        inner_field, lst = self.get_inner_field(field_spec or self.object)
+        if isinstance(inner_field, ModelField):
+            return inner_field.model_class
+
+    def get_structure_label(self, path):
+        return nodes.make_id('dirty-model-structure-{}-{}.{}'.format(self.env.docname,
+                                                                     self.modname,
+                                                                     '.'.join(self.objpath[:-1] + path)))
+
     def add_directive_header(self, sig):
+        if self.get_structure_model() is not None:
+            self.add_line('.. _{}:'.format(self.get_structure_label(self.objpath[-1:])), '<autodoc>')
+            self.add_line('', '<autodoc>')
+
         super(DirtyModelPropertyDocumenter, self).add_directive_header(sig)
 
-        self.build_options(self.object, indent='   ')
+        view = self.get_field_view()
+        self.build_options(self.object, indent='   ', access_mode=self.get_field_access_mode(), view=view)
 
         self.add_line('   ', '<autodoc>')
 
-    def _get_field_type_str(self, field_desc=None):
+    def _get_field_type_str(self, field_desc=None, view=None):
 
         if field_desc is None:
             field_desc = self.object
 
-        if isinstance(field_desc, IntegerField):
-            return ':py:class:`int`'
-        elif isinstance(field_desc, FloatField):
-            return ':py:class:`float`'
-        elif isinstance(field_desc, BooleanField):
-            return ':py:class:`bool`'
-        elif isinstance(field_desc, StringField):
-            return ':py:class:`str`'
-        elif isinstance(field_desc, StringIdField):
-            return ':py:class:`str` (not empty)'
-
-        elif isinstance(field_desc, TimeField):
-            return ':py:class:`~datetime.time`'
-        elif isinstance(field_desc, DateField):
-            return ':py:class:`~datetime.date`'
-        elif isinstance(field_desc, DateTimeField):
-            return ':py:class:`~datetime.datetime`'
-        elif isinstance(field_desc, TimedeltaField):
-            return ':py:class:`~datetime.timedelta`'
-
-        elif isinstance(field_desc, HashMapField):
-            if '<locals>' in field_desc.model_class.__qualname__:
-                return ':py:class:`~{0}`'.format(field_desc.model_class.__name__)
-
-            return ':py:class:`~{0}.{1}` hash map which values are {2}'.format(field_desc.model_class.__module__,
-                                                                               field_desc.model_class.__qualname__,
-                                                                               self._get_field_type_str(
-                                                                                   field_desc.field_type))
-        elif isinstance(field_desc, ModelField):
-            if '<locals>' in field_desc.model_class.__qualname__:
-                return ':py:class:`~{0}`'.format(field_desc.model_class.__name__)
-
-            return ':py:class:`~{0}.{1}`'.format(field_desc.model_class.__module__,
-                                                 field_desc.model_class.__qualname__)
-
-        elif isinstance(field_desc, EnumField):
-            if '<locals>' in field_desc.enum_class.__qualname__:
-                return ':py:class:`~{0}`'.format(field_desc.enum_class.__name__)
-
-            return ':py:class:`~{0}.{1}`'.format(field_desc.enum_class.__module__,
-                                                 field_desc.enum_class.__qualname__)
-
-        elif isinstance(field_desc, ArrayField):
-            return 'List of {0}'.format(self._get_field_type_str(field_desc.field_type))
-
-        elif isinstance(field_desc, MultiTypeField):
-            return ' or '.join([self._get_field_type_str(field_type) for field_type in field_desc.field_types])
-        elif isinstance(field_desc, BlobField):
-            return 'anything'
+        if view is None and field_desc is self.object:
+            view = self.get_field_view()
+
+        if self.is_view_of(view, field_desc):
+            return view.type
+
+        from .field_types import render_field_type
+
+        return render_field_type(field_desc)
 
     def generate(self, more_content=None, real_modname=None,
                  check_module=False, all_members=False):
+        with profile('rest', get_object_name(self.name).rpartition('.')[0]):
+            generate_cached(self, self.generate_content, more_content, real_modname, check_module, all_members)
+
+    def generate_content(self, more_content=None, real_modname=None,
+                         check_module=False, all_members=False):
+        if self.options.get('as-structure', False):
+            # Properties documented by directive count on its structure budget
+            budget = get_structure_budget(self)
+            if budget.is_exhausted():
+                budget.skipped += 1
+                budget.note_truncation(self)
+                return
+            budget.properties += 1
 
         super(DirtyModelPropertyDocumenter, self).generate(more_content, real_modname,
                                                            check_module, all_members)
 
-        self.add_line('', '<autodoc>')
-        self.build_fields(self.object, '')
+        if self.get_parent_model_info() is not None:
+            note_class_dependency(self.env, self.parent)
 
-        if self.options.get('as-structure', False):
-            inner_field, lst = self.get_inner_field(self.object)
-
-            if isinstance(inner_field, ModelField):
-                self.document_structure_inner_model(inner_field.model_class)
+        self.add_line('', '<autodoc>')
+        view = self.get_field_view()
+        if view is not None and view.default_fields is not None:
+            # Default value was rendered when model was preloaded
+            default_fields = view.default_fields[bool(self.options.get('as-structure', False))]
+            self.add_field_lines('', self.get_fields(self.object, default_fields=default_fields, view=view))
+        else:
+            self.build_fields(self.object, '', default=self.get_field_default(), view=view)
+
+        model = self.get_structure_model()
+        if model is not None:
+            self.document_structure_inner_model(model, path=self.objpath[-1:])
 
         self.add_line('', '<autodoc>')
 
-    def build_suffix(self, field_spec, indent):
+    def add_field_lines(self, indent, items):
+        """
+        Add field list (or directive options) lines. Items are ``(name, value)`` tuples
+        where value could be ``None`` for flags.
+        """
+        for name, value in items:
+            if value is None:
+                self.add_line(indent + ':{0}:'.format(name), '<autodoc>')
+            else:
+                self.add_line(indent + ':{0}: {1}'.format(name, value), '<autodoc>')
+
+    def get_suffix_options(self, field_spec):
         if not self.options.get('as-structure', False):
-            return
+            return []
 
         inner_field, lst = self.get_inner_field(field_spec)
 
@@ -383,155 +737,468 @@ class DirtyModelPropertyDocumenter(sphinx.ext.autodoc.AttributeDocumenter):
             suffix += '[]' * lst
 
         if len(suffix):
-            self.add_line(indent + ':suffix: {0}'.format(suffix), '<autodoc>')
+            return [('suffix', suffix)]
+        return []
+
+    def get_type_options(self, field_spec, view=None):
+        from dirty_models.fields import EnumField, ModelField
 
-    def build_type(self, field_spec, indent):
         if self.options.get('as-structure', False):
             field_spec, lst = self.get_inner_field(field_spec)
 
-        fieldtype = self._get_field_type_str(field_spec)
+        fieldtype = self._get_field_type_str(field_spec, view=view)
 
         if self.options.get('as-structure', False):
             if isinstance(field_spec, ModelField):
-                return
+                return []
 
             if isinstance(field_spec, EnumField) and self.options.get('struct-expand-enums'):
-                self.add_line(indent + ':type: enum', '<autodoc>')
-                return
+                return [('type', 'enum')]
 
-        self.add_line(indent + ':type: {0}'.format(fieldtype), '<autodoc>')
+        if fieldtype is None:
+            return []
 
-    def build_access_mode(self, field_spec, indent):
-        if self.options.get('hide-access-mode', False):
-            return
+        return [('type', fieldtype)]
 
-        try:
-            if field_spec.read_only:
-                mode = 'read-only'
-            else:
-                mode = 'read-and-write'
-        except AttributeError:
-            modes = {AccessMode.READ_AND_WRITE: 'read-and-write',
-                     AccessMode.WRITABLE_ONLY_ON_CREATION: 'writable-only-on-creation',
-                     AccessMode.READ_ONLY: 'read-only',
-                     AccessMode.HIDDEN: 'hidden'}
-            mode = modes[field_spec.access_mode]
+    def get_access_mode_options(self, field_spec, access_mode=None):
+        if self.options.get('hide-access-mode', False):
+            return []
 
-        self.add_line(indent + ':access-mode: {}'.format(mode), '<autodoc>')
+        if access_mode is None:
+            access_mode = get_field_access_mode(None, field_spec)
 
-    def build_options(self, field_spec, indent):
-        # if self.options.get('noindex'):
-        #     self.add_line(indent + ':noindex:', '<autodoc>')
+        return [('access-mode', access_mode_names[access_mode.name])]
 
+    def get_options(self, field_spec, access_mode=None, view=None):
+        options = []
         if self.options.get('as-structure'):
-            self.add_line(indent + ':as-structure:', '<autodoc>')
-
-        self.build_type(field_spec, indent)
-        self.build_access_mode(field_spec, indent)
+            options.append(('as-structure', None))
 
-    def build_autodoc_options(self, field_spec, indent):
-        if self.options.get('hide-access-mode'):
-            self.add_line(indent + ':hide-access-mode:', '<autodoc>')
+        options.extend(self.get_type_options(field_spec, view=view))
+        options.extend(self.get_access_mode_options(field_spec, access_mode=access_mode))
+        return options
 
-        if self.options.get('hide-alias'):
-            self.add_line(indent + ':hide-alias:', '<autodoc>')
+    def build_suffix(self, field_spec, indent):
+        self.add_field_lines(indent, self.get_suffix_options(field_spec))
 
-    def build_default_value(self, field_spec, indent):
-        if field_spec.default is None:
-            return
-        default = field_spec.default
-        if isinstance(default, factory):
-            default = default()
+    def build_options(self, field_spec, indent, access_mode=None, view=None):
+        self.add_field_lines(indent, self.get_options(field_spec, access_mode=access_mode, view=view))
 
-        if hasattr(self.object, 'get_formatted_value'):
-            default = field_spec.get_formatted_value(default)
+    def get_default_value_fields(self, field_spec, default=None):
+        return get_default_value_fields(field_spec,
+                                        default=default,
+                                        as_structure=self.options.get('as-structure', False),
+                                        formatted=hasattr(self.object, 'get_formatted_value'))
 
-        if isinstance(default, Enum):
-            if self.options.get('as-structure'):
-                default = default.value
-            else:
-                default = ':py:attr:`{0}.{1}`'.format(default.__class__.__qualname__,
-                                                      default.name)
-        self.add_line(indent + ':default: {0}'.format(default), '<autodoc>')
-
-    def build_timezone(self, field_spec, indent):
+    def get_timezone_fields(self, field_spec):
         try:
             if field_spec.default_timezone is not None:
                 try:
                     if field_spec.force_timezone:
-                        self.add_line(indent + ':forcedtimezone: {0}'.format(field_spec.default_timezone),
-                                      '<autodoc>')
+                        return [('forcedtimezone', '{0}'.format(field_spec.default_timezone))]
                     else:
                         raise AttributeError()
                 except AttributeError:
-                    self.add_line(indent + ':defaulttimezone: {0}'.format(field_spec.default_timezone),
-                                  '<autodoc>')
+                    return [('defaulttimezone', '{0}'.format(field_spec.default_timezone))]
         except AttributeError:
             pass
+        return []
 
-    def build_format(self, field_spec, indent):
+    def get_format_fields(self, field_spec):
         try:
             frt = field_format(field_spec.parse_format)
             if frt:
-                self.add_line(indent + ':fieldformat: {0}'.format(frt), '<autodoc>')
+                return [('fieldformat', frt)]
         except AttributeError:
             pass
+        return []
 
-    def build_alias(self, field_spec, indent):
+    def get_alias_fields(self, field_spec, view=None):
         if self.options.get('hide-alias', False):
-            return
-        for alias in (field_spec.alias or []):
-            self.add_line(indent + ':alias {0}:'.format(alias), '<autodoc>')
+            return []
+
+        if self.is_view_of(view, field_spec):
+            aliases = view.aliases
+        else:
+            aliases = field_spec.alias or []
+        return [('alias {0}'.format(alias), None) for alias in aliases]
+
+    def get_enum_option_fields(self, field_spec):
+        from dirty_models.fields import EnumField
 
-    def build_field_options(self, field_spec, indent):
         if not self.options.get('as-structure', False) \
                 or not isinstance(field_spec, EnumField) \
                 or not self.options.get('struct-expand-enums'):
-            return
+            return []
 
-        for v in field_spec.enum_class:
-            self.add_line(indent + ':option {0}:'.format(v.value), '<autodoc>')
+        note_class_dependency(self.env, field_spec.enum_class)
+        return [('option {0}'.format(v.value), None) for v in field_spec.enum_class]
 
-    def build_fields(self, field_spec, indent):
-        self.build_default_value(field_spec, indent)
-        self.build_timezone(field_spec, indent)
-        self.build_format(field_spec, indent)
-        self.build_alias(field_spec, indent)
-        self.build_field_options(field_spec, indent)
+    def get_fields(self, field_spec, default=None, default_fields=None, view=None):
+        if default_fields is None:
+            default_fields = self.get_default_value_fields(field_spec, default=default)
 
-    def document_structure_inner_model(self, model, indent=''):
-        self.add_line(indent + '', '<autodoc>')
+        return list(default_fields) \
+            + self.get_timezone_fields(field_spec) \
+            + self.get_format_fields(field_spec) \
+            + self.get_alias_fields(field_spec, view=view) \
+            + self.get_enum_option_fields(field_spec)
 
-        for field_name, member in model.get_structure().items():
-            if member.metadata is not None and member.metadata.get('hidden', False):
-                continue
+    def build_fields(self, field_spec, indent, default=None, view=None):
+        self.add_field_lines(indent, self.get_fields(field_spec, default=default, view=view))
 
-            self.add_line(indent + f'.. py:dirtymodelproperty:: {model.__qualname__}.{field_name}', '<autodoc>')
-            self.add_line(indent + f'   :module: {model.__module__}', '<autodoc>')
-            self.build_suffix(member, indent + '   ')
+    def get_structure_properties(self, model, path=None, expanded=None, budget=None):
+        """
+        Returns model fields as a list of :class:`StructureProperty`, which do not depend
+        on document: expanded models are identified by their field path relative to
+        structure root, and repeated ones by their model.
+
+        Models on ``expanded`` set (and models expanded here, which are added to it) are not
+        expanded again. Their occurrences (including recursive ones) link to their first expansion
+        when properties are bound to document.
+
+        Expansion stops when ``budget`` is exhausted. Models which are not expanded,
+        or partially expanded, are marked as truncated.
+        """
+        path = path or ()
+        if expanded is None:
+            expanded = set()
+        if budget is None:
+            budget = get_structure_budget(self)
+
+        model_info = get_model_info(self.env, model)
+        note_class_dependency(self.env, model)
+
+        properties = []
+        for field_name, member in model_info.visible_structure.items():
+            if budget.is_exhausted():
+                budget.note_truncation(self)
+                break
+            budget.properties += 1
+
+            view = model_info.get_field_view(field_name)
+            field_path = path + (field_name,)
+            inner_model = self.get_structure_model(member)
+
+            expanded_path = None
+            linked_model = None
+            truncated = None
+            if inner_model is not None:
+                if self.is_structure_expanded(inner_model, expanded):
+                    linked_model = inner_model
+                elif budget.can_expand(len(field_path) + 1):
+                    expanded.add(inner_model)
+                    expanded_path = field_path
+                    linked_model = inner_model
+                else:
+                    truncated = get_class_path(inner_model)
+                    budget.note_truncation(self)
+
+            options = [('module', model.__module__)]
+            options.extend(self.get_suffix_options(member))
 
             member, lst = self.get_inner_field(member)
 
-            self.build_options(member, indent + '   ')
+            options.extend(self.get_options(member, access_mode=view.access_mode, view=view))
             if self.options.get('noindex'):
-                self.add_line(indent + '   :noindex:', '<autodoc>')
+                options.append(('noindex', None))
 
-            self.add_line(indent + '   ', '<autodoc>')
-
-            docstring = getdoc(member)
+            docstring = view.docstring if lst == 0 else getdoc(member)
             if docstring:
                 tab_width = self.directive.state.document.settings.tab_width
-                [self.add_line(indent + '   ' + l, '<autodoc>') for l in prepare_docstring(docstring, tab_width)]
+                docstring = prepare_docstring(docstring, tab_width)
+            else:
+                docstring = []
+
+            prop = StructureProperty('{}.{}'.format(model.__qualname__, field_name),
+                                     options,
+                                     docstring,
+                                     self.get_fields(member, default=view.default, view=view),
+                                     truncated=truncated,
+                                     path=expanded_path,
+                                     model=linked_model)
+            properties.append(prop)
+
+            if expanded_path is not None:
+                prop.children = self.get_structure_properties(member.model_class,
+                                                              path=field_path,
+                                                              expanded=expanded,
+                                                              budget=budget)
+                if is_structure_truncated(self.env, member.model_class, prop.children):
+                    prop.truncated = get_class_path(member.model_class)
+
+        return properties
+
+    def is_structure_expanded(self, model, expanded):
+        """
+        Whether model was already expanded, so it links to its first expansion. Models without
+        visible fields (like hash maps) have nothing to link to, so they are expanded again.
+        """
+        return model in expanded and bool(get_model_info(self.env, model).visible_structure)
+
+    def get_structure_fragment_key(self, model, expanded):
+        options = tuple((name, self.options.get(name)) for name in structure_options)
+        return (model,
+                frozenset(expanded),
+                options,
+                hasattr(self.object, 'get_formatted_value'),
+                self.directive.state.document.settings.tab_width)
+
+    def get_structure_fragment(self, model):
+        """
+        Returns :class:`~dirty_models_sphinx.fragments.StructureFragment` of a model. Fragments
+        are taken from in-build cache (``dirty_model_structure_cache_size``) when possible.
 
+        Fragments depend on remaining structure budget, so they are not cached when budget is limited.
+        Models already expanded by directive are not expanded again by fragment.
+        """
+        budget = get_structure_budget(self)
+        expanded = set(get_structure_expansions(self))
+        cache = get_fragment_cache(self.env.app) if not budget.is_limited() else None
+        if cache is not None:
+            key = self.get_structure_fragment_key(model, expanded)
+            fragment = cache.get(key)
+            note_fragment_lookup(self.env, fragment is not None)
+            if fragment is not None:
+                for cls in fragment.classes:
+                    note_class_dependency(self.env, cls)
+                return fragment
+
+        # Classes rendered by structure are recorded, so they could be noted again on cache hits
+        cache_recorder = get_cache_recorder(self.env)
+        recorder = self.env.temp_data[RECORDER_KEY] = CacheRecorder()
+        try:
+            properties = self.get_structure_properties(model, expanded=expanded, budget=budget)
+        finally:
+            if cache_recorder is None:
+                del self.env.temp_data[RECORDER_KEY]
+            else:
+                self.env.temp_data[RECORDER_KEY] = cache_recorder
+                cache_recorder.classes.update(recorder.classes)
+
+        fragment = StructureFragment(properties, frozenset(recorder.classes))
+        if cache is not None:
+            cache.store(key, fragment)
+        return fragment
+
+    def bind_structure_properties(self, properties, path):
+        """
+        Returns copies of document independent structure properties with labels and references
+        of a structure embedded on current document at field ``path``. Expanded models are
+        registered on directive expansions, so further occurrences link to them.
+        """
+        expansions = get_structure_expansions(self)
+        result = []
+        for prop in properties:
+            label = None
+            reference = None
+            children = None
+            if prop.path is not None:
+                label_path = path + list(prop.path)
+                label = self.get_structure_label(label_path)
+                expansions[prop.model] = ('.'.join(label_path), label)
+                children = self.bind_structure_properties(prop.children, path)
+            elif prop.model is not None:
+                reference = expansions[prop.model]
+
+            result.append(StructureProperty(prop.name, prop.options, prop.docstring, prop.fields,
+                                            label=label, reference=reference, children=children,
+                                            truncated=prop.truncated))
+        return result
+
+    def add_structure_lines(self, properties, indent=''):
+        self.add_line(indent + '', '<autodoc>')
+
+        for prop in properties:
+            if prop.label is not None:
+                self.add_line(indent + '.. _{}:'.format(prop.label), '<autodoc>')
+                self.add_line(indent + '', '<autodoc>')
+
+            self.add_line(indent + '.. py:dirtymodelproperty:: {}'.format(prop.name), '<autodoc>')
+            self.add_field_lines(indent + '   ', prop.options)
             self.add_line(indent + '   ', '<autodoc>')
-            self.build_fields(member, indent + '   ')
+
+            for line in prop.docstring:
+                self.add_line(indent + '   ' + line, '<autodoc>')
+
+            self.add_line(indent + '   ', '<autodoc>')
+            self.add_field_lines(indent + '   ', prop.fields)
 
             self.add_line(indent + '', '<autodoc>')
 
-            if isinstance(member, ModelField):
-                self.document_structure_inner_model(member.model_class, indent=indent + '   ')
+            if prop.label is not None:
+                self.add_structure_lines(prop.children, indent=indent + '   ')
 
                 self.add_line(indent + '', '<autodoc>')
+            elif prop.reference is not None:
+                self.add_structure_reference(prop.reference, indent=indent + '   ')
+
+            if prop.truncated is not None:
+                self.add_structure_truncation(prop.truncated, indent=indent + '   ')
+
+    def add_structure_directive(self, properties, indent=''):
+        """
+        Add a ``dirtymodelstructure`` directive which builds structure nodes directly,
+        instead of generating reST for each property.
+        """
+        key = note_structure(self.env, properties)
+
+        self.add_line(indent + '', '<autodoc>')
+        self.add_line(indent + '.. py:dirtymodelstructure:: {}'.format(key), '<autodoc>')
+
+        recorder = get_cache_recorder(self.env)
+        if recorder is not None:
+            recorder.structures.append((len(self.directive.result) - 1, key))
+
+        self.add_line(indent + '', '<autodoc>')
+
+    def document_structure_inner_model(self, model, indent='', path=None):
+        """
+        Generate model fields as structure embedded at field ``path``. If model was already
+        expanded by directive, it links to its first expansion.
+        """
+        path = path or []
+        expansions = get_structure_expansions(self)
+        if self.is_structure_expanded(model, expansions):
+            self.add_structure_reference(expansions[model], indent=indent)
+            return
+
+        # Documented property is on depth 1
+        budget = get_structure_budget(self)
+        if not budget.can_expand(1):
+            budget.note_truncation(self)
+            self.add_structure_truncation(get_class_path(model), indent=indent)
+            return
+
+        expansions[model] = ('.'.join(path), self.get_structure_label(path))
+        fragment = self.get_structure_fragment(model)
+        properties = self.bind_structure_properties(fragment.properties, path)
+
+        if self.env.config.dirty_model_structure_renderer == 'nodes':
+            self.add_structure_directive(properties, indent=indent)
+        else:
+            self.add_structure_lines(properties, indent=indent)
+
+        if budget.is_limited() and is_structure_truncated(self.env, model, fragment.properties):
+            self.add_structure_truncation(get_class_path(model), indent=indent)
+
+    def add_structure_reference(self, reference, indent=''):
+        self.add_line(indent + 'Structure described at :ref:`{0} <{1}>`.'.format(*reference), '<autodoc>')
+        self.add_line(indent + '', '<autodoc>')
+
+    def add_structure_truncation(self, model_path, indent=''):
+        self.add_line(indent + 'Structure truncated, described at :py:class:`~{}`.'.format(model_path), '<autodoc>')
+        self.add_line(indent + '', '<autodoc>')
+
+
+class StructureBudget:
+    """
+    Limits of structures documented by an autodoc directive. ``0`` means no limit.
+    """
+
+    def __init__(self, max_depth=0, max_properties=0):
+        #: Maximum depth of properties (properties documented by directive are on depth 1)
+        self.max_depth = max_depth
+        #: Maximum number of properties
+        self.max_properties = max_properties
+        #: Number of properties documented
+        self.properties = 0
+        #: Number of truncations
+        self.truncated = 0
+        #: Number of properties which were not documented by directive
+        self.skipped = 0
+
+    def is_limited(self):
+        return bool(self.max_depth or self.max_properties)
+
+    def is_exhausted(self):
+        return bool(self.max_properties) and self.properties >= self.max_properties
+
+    def note_truncation(self, documenter):
+        """
+        Records a truncation. A warning is emitted on first one.
+        """
+        self.truncated += 1
+        if self.truncated > 1:
+            return
+
+        logger.warning('[dirty_models_sphinx] structures truncated from %s '
+                       '(struct-max-depth: %d, struct-max-properties: %d)',
+                       get_object_name(documenter.name), self.max_depth, self.max_properties,
+                       location=(documenter.env.docname, documenter.directive.lineno),
+                       type='dirty_models', subtype='structure')
+
+    def can_expand(self, depth):
+        """
+        Whether a model referenced by a property on ``depth`` could be expanded.
+        """
+        return not self.max_depth or depth < self.max_depth
+
+
+def get_structure_budget(documenter):
+    """
+    Returns :class:`StructureBudget` of autodoc directive which runs documenter. It is shared
+    by all documenters of directive, so it bounds whole directive output.
+    """
+    bridge = documenter.directive
+    try:
+        return bridge.dirty_models_structure_budget
+    except AttributeError:
+        budget = bridge.dirty_models_structure_budget = StructureBudget(
+            max_depth=documenter.options.get('struct-max-depth', 0),
+            max_properties=documenter.options.get('struct-max-properties', 0)
+        )
+        return budget
+
+
+def get_structure_expansions(documenter):
+    """
+    Returns models expanded as structure by autodoc directive which runs documenter. It is
+    a dictionary of model to title and label of its first expansion, shared by all documenters
+    of directive, so each model is expanded just once per directive.
+    """
+    bridge = documenter.directive
+    try:
+        return bridge.dirty_models_structure_expansions
+    except AttributeError:
+        expansions = bridge.dirty_models_structure_expansions = {}
+        return expansions
+
+
+def is_structure_truncated(env, model, properties):
+    """
+    Whether some fields of a model are missing on its structure properties.
+    """
+    return len(properties) < len(get_model_info(env, model).visible_structure)
+
+
+class StructureProperty:
+    """
+    A model field expanded as part of a structure.
+    """
+
+    def __init__(self, name, options, docstring, fields, label=None, reference=None, children=None,
+                 truncated=None, path=None, model=None):
+        #: Property name (``Model.field``)
+        self.name = name
+        #: List of ``(name, value)`` directive options
+        self.options = options
+        #: Docstring lines
+        self.docstring = docstring
+        #: List of ``(name, value)`` fields
+        self.fields = fields
+        #: Label of expanded model structure
+        self.label = label
+        #: Title and label of first expansion of a repeated model
+        self.reference = reference
+        #: Expanded model properties
+        self.children = children or []
+        #: Dotted path of model whose expansion was truncated, if any
+        self.truncated = truncated
+        #: Field path of expanded model, relative to structure root
+        self.path = path
+        #: Model expanded by property, or repeated model which links to its first expansion
+        self.model = model
 
 
 class DirtyModelAdditionalPropertiesDocumenter(DirtyModelPropertyDocumenter):
@@ -0,0 +1,137 @@
+"""
+Field type renderers
+"""
+
+from weakref import WeakKeyDictionary
+
+from dirty_models.fields import (ArrayField, BlobField, BooleanField, DateField, DateTimeField, EnumField,
+                                 FloatField, HashMapField, IntegerField, ModelField, MultiTypeField, StringField,
+                                 StringIdField, TimeField, TimedeltaField)
+
+from .profiling import profile
+
+_renderers = {}
+_resolved_renderers = {}
+_rendered_types = WeakKeyDictionary()
+
+
+def register_field_type_renderer(field_class, renderer=None):
+    """
+    Register a function which renders field type of ``field_class`` instances (and its subclasses)
+    as reST. Renderer receives field instance and must return a string or ``None``.
+    It could be used as decorator:
+
+    .. code-block:: python
+
+        from dirty_models_sphinx.field_types import register_field_type_renderer
+
+        @register_field_type_renderer(MoneyField)
+        def render_money_field(field):
+            return ':py:class:`~decimal.Decimal` in {}'.format(field.currency)
+    """
+    if renderer is None:
+        def decorator(func):
+            register_field_type_renderer(field_class, func)
+            return func
+
+        return decorator
+
+    _renderers[field_class] = renderer
+    _resolved_renderers.clear()
+    _rendered_types.clear()
+    return renderer
+
+
+def get_field_type_renderer(field_class):
+    """
+    Returns renderer for a field class. It is resolved using class MRO just once.
+    """
+    try:
+        return _resolved_renderers[field_class]
+    except KeyError:
+        pass
+
+    renderer = None
+    for klass in field_class.__mro__:
+        try:
+            renderer = _renderers[klass]
+            break
+        except KeyError:
+            continue
+
+    _resolved_renderers[field_class] = renderer
+    return renderer
+
+
+def render_field_type(field):
+    """
+    Returns field type as reST. Rendered string is memoized per field instance.
+    """
+    try:
+        return _rendered_types[field]
+    except KeyError:
+        pass
+
+    with profile('field_type'):
+        renderer = get_field_type_renderer(type(field))
+        result = _rendered_types[field] = renderer(field) if renderer is not None else None
+    return result
+
+
+def class_reference(cls):
+    if '<locals>' in cls.__qualname__:
+        return ':py:class:`~{0}`'.format(cls.__name__)
+
+    return ':py:class:`~{0}.{1}`'.format(cls.__module__, cls.__qualname__)
+
+
+def constant_renderer(text):
+    return lambda field: text
+
+
+register_field_type_renderer(IntegerField, constant_renderer(':py:class:`int`'))
+register_field_type_renderer(FloatField, constant_renderer(':py:class:`float`'))
+register_field_type_renderer(BooleanField, constant_renderer(':py:class:`bool`'))
+register_field_type_renderer(StringField, constant_renderer(':py:class:`str`'))
+register_field_type_renderer(StringIdField, constant_renderer(':py:class:`str` (not empty)'))
+register_field_type_renderer(TimeField, constant_renderer(':py:class:`~datetime.time`'))
+register_field_type_renderer(DateField, constant_renderer(':py:class:`~datetime.date`'))
+register_field_type_renderer(DateTimeField, constant_renderer(':py:class:`~datetime.datetime`'))
+register_field_type_renderer(TimedeltaField, constant_renderer(':py:class:`~datetime.timedelta`'))
+register_field_type_renderer(BlobField, constant_renderer('anything'))
+
+try:
+    from dirty_models.fields import BytesField
+except ImportError:  # pragma: no cover
+    pass
+else:
+    register_field_type_renderer(BytesField, constant_renderer(':py:class:`bytes`'))
+
+
+@register_field_type_renderer(HashMapField)
+def render_hashmap_field(field):
+    if '<locals>' in field.model_class.__qualname__:
+        return class_reference(field.model_class)
+
+    return '{0} hash map which values are {1}'.format(class_reference(field.model_class),
+                                                      render_field_type(field.field_type))
+
+
+@register_field_type_renderer(ModelField)
+def render_model_field(field):
+    return class_reference(field.model_class)
+
+
+@register_field_type_renderer(EnumField)
+def render_enum_field(field):
+    return class_reference(field.enum_class)
+
+
+@register_field_type_renderer(ArrayField)
+def render_array_field(field):
+    return 'List of {0}'.format(render_field_type(field.field_type))
+
+
+@register_field_type_renderer(MultiTypeField)
+def render_multitype_field(field):
+    return ' or '.join([render_field_type(field_type) for field_type in field.field_types])
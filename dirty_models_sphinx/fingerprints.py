@@ -0,0 +1,142 @@
+"""
+Structural fingerprints of models and enumerations
+"""
+
+from enum import Enum
+from hashlib import sha1
+
+from dirty_models.fields import ArrayField, EnumField, HashMapField, ModelField, MultiTypeField
+from dirty_models.models import BaseModel
+from dirty_models.utils import factory
+
+from .cache import stable_repr
+from .introspection import get_introspection_cache, get_model_info, is_hidden_field
+from .profiling import get_class_path
+
+
+def get_fingerprint(app, cls):
+    """
+    Returns structural fingerprint of a model or enumeration class. It is a digest of
+    everything documented about the class: field types, names, aliases, access modes
+    (including overridden ones), hidden flags, defaults, formats, timezones, docstrings,
+    additional properties type and enumeration members, together with fingerprints of every
+    model or enumeration it references.
+
+    It is computed once per class and build, and it does not change between processes.
+    """
+    if not isinstance(cls, type):
+        cls = type(cls)
+
+    fingerprints = get_introspection_cache(app).fingerprints
+    try:
+        return fingerprints[cls]
+    except KeyError:
+        pass
+
+    # Fingerprint covers all reachable classes sorted by path, so it does not depend
+    # on which class of a reference cycle is fingerprinted first.
+    reachable = {}
+    pending = [cls]
+    while pending:
+        klass = pending.pop()
+        path = get_class_path(klass)
+        if path in reachable:
+            continue
+
+        digest, references = get_local_fingerprint(app, klass)
+        reachable[path] = digest
+        pending.extend(references)
+
+    fingerprint = fingerprints[cls] = sha1(repr(sorted(reachable.items())).encode()).hexdigest()
+    return fingerprint
+
+
+def get_field_fingerprint(app, field):
+    """
+    Returns structural fingerprint of a field, including fingerprints of models
+    and enumerations it references.
+    """
+    references = set()
+    description = describe_field(field, references)
+    return sha1(repr([description, sorted(get_fingerprint(app, cls) for cls in references)]).encode()).hexdigest()
+
+
+def get_local_fingerprint(app, cls):
+    """
+    Returns a tuple of digest of a class, without following references,
+    and the set of classes it references.
+    """
+    local_fingerprints = get_introspection_cache(app).local_fingerprints
+    try:
+        return local_fingerprints[cls]
+    except KeyError:
+        pass
+
+    references = set()
+    if issubclass(cls, Enum):
+        description = describe_enum(cls)
+    elif issubclass(cls, BaseModel):
+        description = describe_model(app, cls, references)
+    else:
+        description = [get_class_path(cls), cls.__doc__]
+
+    result = local_fingerprints[cls] = (sha1(repr(description).encode()).hexdigest(), references)
+    return result
+
+
+def describe_enum(enum_class):
+    return [get_class_path(enum_class),
+            enum_class.__doc__,
+            [(member.name, stable_repr(member.value)) for member in enum_class]]
+
+
+def describe_model(app, model, references):
+    model_info = get_model_info(app.env, model)
+    field_type = getattr(model, '__field_type__', None)
+
+    return [get_class_path(model),
+            [get_class_path(base) for base in model.__bases__],
+            model.__doc__,
+            [(name, int(model_info.access_modes[name]), describe_field(field, references))
+             for name, field in sorted(model_info.structure.items())],
+            describe_field(field_type, references) if field_type else None]
+
+
+def describe_field(field, references):
+    """
+    Returns a stable description of a field. Referenced models and enumerations
+    are added to ``references``, and they are described by path.
+    """
+    description = [get_class_path(type(field)),
+                   field.name,
+                   stable_repr(field.alias),
+                   describe_default(field.default),
+                   field.__doc__,
+                   bool(is_hidden_field(field)),
+                   stable_repr(getattr(field, 'parse_format', None)),
+                   stable_repr(getattr(field, 'default_timezone', None)),
+                   getattr(field, 'force_timezone', None)]
+
+    if isinstance(field, (ModelField, HashMapField)) and field.model_class is not None:
+        references.add(field.model_class)
+        description.append(get_class_path(field.model_class))
+
+    if isinstance(field, EnumField):
+        references.add(field.enum_class)
+        description.append(get_class_path(field.enum_class))
+
+    if isinstance(field, (ArrayField, HashMapField)) and field.field_type is not None:
+        description.append(describe_field(field.field_type, references))
+
+    if isinstance(field, MultiTypeField):
+        description.append([describe_field(field_type, references) for field_type in field.field_types])
+
+    return description
+
+
+def describe_default(default):
+    if isinstance(default, factory):
+        return 'factory({})'.format(stable_repr(default.func))
+    if isinstance(default, BaseModel):
+        return stable_repr(default.export_data())
+    return stable_repr(default)
@@ -0,0 +1,131 @@
+"""
+In-build cache of structure fragments
+
+Models embedded as structure on many pages are expanded once per set of documenter
+options. Fragments do not depend on document nor on field path where they are embedded:
+labels of nested expansions are stored as field paths relative to structure root, and
+they are bound to current document each time a fragment is used.
+
+Cache is bounded and least recently used fragments are evicted first.
+"""
+
+from collections import OrderedDict
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StructureFragment:
+    """
+    Structure of a model which does not depend on document.
+    """
+
+    __slots__ = ('properties', 'classes')
+
+    def __init__(self, properties, classes):
+        #: List of :class:`~dirty_models_sphinx.documenters.StructureProperty` with relative paths
+        #: instead of labels and references
+        self.properties = properties
+        #: Classes rendered by structure (models, their ancestors and enumerations)
+        self.classes = classes
+
+
+class FragmentCache:
+    """
+    Least recently used cache of :class:`StructureFragment`. It keeps ``maxsize`` fragments at most.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._fragments = OrderedDict()
+
+    def get(self, key):
+        try:
+            fragment = self._fragments[key]
+        except KeyError:
+            return None
+        self._fragments.move_to_end(key)
+        return fragment
+
+    def store(self, key, fragment):
+        self._fragments[key] = fragment
+        self._fragments.move_to_end(key)
+        while len(self._fragments) > self.maxsize:
+            self._fragments.popitem(last=False)
+
+    def clear(self):
+        self._fragments.clear()
+
+    def __len__(self):
+        return len(self._fragments)
+
+
+def get_fragment_cache(app):
+    """
+    Returns structure fragment cache of Sphinx application or ``None`` if it is disabled
+    (``dirty_model_structure_cache_size`` is ``0``).
+    """
+    maxsize = app.config.dirty_model_structure_cache_size
+    if not maxsize:
+        return None
+
+    try:
+        cache = app.dirty_models_fragment_cache
+    except AttributeError:
+        cache = app.dirty_models_fragment_cache = FragmentCache(maxsize)
+    cache.maxsize = maxsize
+    return cache
+
+
+def get_fragment_stats(env):
+    """
+    Returns dictionary of document name to ``[hits, misses]`` of structure fragment cache.
+    It is stored on build environment, so it could be merged from parallel readers.
+    """
+    try:
+        return env.dirty_models_fragment_stats
+    except AttributeError:
+        stats = env.dirty_models_fragment_stats = {}
+        return stats
+
+
+def note_fragment_lookup(env, hit):
+    stats = get_fragment_stats(env).setdefault(env.docname, [0, 0])
+    stats[0 if hit else 1] += 1
+
+
+def clear_fragment_cache(app, env, docnames):
+    """
+    Drops cached fragments and their statistics. It is connected to ``env-before-read-docs``,
+    so models reloaded between builds are expanded again.
+    """
+    try:
+        app.dirty_models_fragment_cache.clear()
+    except AttributeError:
+        pass
+
+    get_fragment_stats(env).clear()
+
+
+def merge_fragment_stats(app, env, docnames, other):
+    stats = get_fragment_stats(env)
+    other_stats = get_fragment_stats(other)
+    for docname in docnames:
+        try:
+            stats[docname] = other_stats[docname]
+        except KeyError:
+            pass
+
+
+def log_fragment_stats(app, env):
+    """
+    Logs hits and misses of structure fragment cache on documents read. It is connected to ``env-updated``.
+    """
+    stats = get_fragment_stats(env)
+    if not stats:
+        return
+
+    hits = sum(item[0] for item in stats.values())
+    misses = sum(item[1] for item in stats.values())
+    logger.info('[dirty_models_sphinx] structure fragments: %d hits, %d misses', hits, misses)
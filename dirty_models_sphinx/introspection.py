@@ -0,0 +1,331 @@
+"""
+Model introspection
+"""
+
+import sys
+from enum import IntEnum
+from inspect import getdoc
+
+from sphinx.util import logging
+
+from .profiling import get_class_path, profile
+
+logger = logging.getLogger(__name__)
+
+
+class FallbackAccessMode(IntEnum):
+    """
+    Access modes used with versions of Dirty Models which do not define them.
+    """
+    READ_AND_WRITE = 0
+    WRITABLE_ONLY_ON_CREATION = 1
+    READ_ONLY = 2
+    HIDDEN = 3
+
+
+def get_access_mode_enum():
+    """
+    Returns Dirty Models ``AccessMode`` enumeration. It is imported on first use.
+    """
+    try:
+        from dirty_models import AccessMode
+    except ImportError:
+        return FallbackAccessMode
+    return AccessMode
+
+
+def __getattr__(name):
+    # ``AccessMode`` is resolved lazily, so Dirty Models is not imported with extension
+    if name == 'AccessMode':
+        return get_access_mode_enum()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def get_loaded_class(modname, name):
+    """
+    Returns a class only if its module is already imported, otherwise ``None``.
+    An object could not be an instance of a class which is not loaded yet, so Dirty Models
+    does not need to be imported to check objects.
+    """
+    try:
+        return getattr(sys.modules[modname], name)
+    except KeyError:
+        return None
+
+
+def is_model_class(obj):
+    """
+    Whether object is a :class:`dirty_models.models.BaseModel` subclass.
+    """
+    base_model = get_loaded_class('dirty_models.models', 'BaseModel')
+    return base_model is not None and isinstance(obj, type) and issubclass(obj, base_model)
+
+
+def is_model(obj):
+    """
+    Whether object is a :class:`dirty_models.models.BaseModel` subclass or instance.
+    """
+    base_model = get_loaded_class('dirty_models.models', 'BaseModel')
+    if base_model is None:
+        return False
+    return isinstance(obj, base_model) or (isinstance(obj, type) and issubclass(obj, base_model))
+
+
+def is_field(obj):
+    """
+    Whether object is a :class:`dirty_models.fields.BaseField` instance.
+    """
+    base_field = get_loaded_class('dirty_models.fields', 'BaseField')
+    return base_field is not None and isinstance(obj, base_field)
+
+
+def get_field_access_mode(model, field):
+    """
+    Resolve access mode of a field in a model class.
+
+    Access modes overridden by model (``__override_field_access_modes__``) have
+    precedence over field access mode.
+    """
+    try:
+        return model.__override_field_access_modes__[field.name]
+    except (AttributeError, KeyError):
+        try:
+            if field.read_only:
+                return get_access_mode_enum().READ_ONLY
+        except AttributeError:
+            try:
+                return field.access_mode
+            except AttributeError:
+                pass
+
+    return get_access_mode_enum().READ_AND_WRITE
+
+
+def get_field_owner(model, field_name):
+    """
+    Returns first class on model MRO which defines a field or overrides its access mode.
+    Fields are copied to each subclass structure, so they are looked for on class dictionaries.
+    """
+    for klass in model.__mro__:
+        namespace = vars(klass)
+        if is_field(namespace.get(field_name)) \
+                or field_name in namespace.get('__override_field_access_modes__', {}):
+            return klass
+
+    return model
+
+
+def is_hidden_field(field):
+    """
+    Whether field must not be documented because of ``hidden`` key on its metadata.
+    """
+    return field.metadata is not None and field.metadata.get('hidden', False)
+
+
+class FieldView:
+    """
+    Immutable view of a model field. It carries everything documented about the field
+    resolved for its model, so documenters do not need to look it up (or modify field,
+    which is shared by subclasses) again.
+
+    Default value is resolved on first use, because it requires model default data.
+    ``default_fields`` is a tuple of default value fields rendered for a property and for
+    a structure, when they were rendered on preload (see :mod:`dirty_models_sphinx.snapshots`),
+    otherwise ``None``.
+    """
+
+    __slots__ = ('name', 'field', 'access_mode', 'type', 'aliases', 'docstring', 'default_fields', '_model_info')
+
+    def __init__(self, name, field, access_mode, type, aliases, docstring, default_fields=None, model_info=None):
+        set_attr = super(FieldView, self).__setattr__
+        set_attr('name', name)
+        set_attr('field', field)
+        set_attr('access_mode', access_mode)
+        set_attr('type', type)
+        set_attr('aliases', aliases)
+        set_attr('docstring', docstring)
+        set_attr('default_fields', default_fields)
+        set_attr('_model_info', model_info)
+
+    @property
+    def default(self):
+        if self._model_info is None:
+            return self.field.default
+        return self._model_info.default_data.get(self.name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.name)
+
+
+class ModelInfo:
+    """
+    Introspected data of a :class:`dirty_models.models.BaseModel` class.
+
+    Structure and access modes are resolved on creation. Default data is resolved
+    on first use because it could run field factories.
+    """
+
+    def __init__(self, model, snapshot=None):
+        self.model = model
+        self.snapshot = snapshot
+        self.structure = model.get_structure()
+        self.access_modes = {field_name: get_field_access_mode(model, field)
+                             for field_name, field in self.structure.items()}
+        self.visible_structure = {field_name: field
+                                  for field_name, field in self.structure.items()
+                                  if not is_hidden_field(field)}
+        self._default_data = None
+        self._field_owners = None
+        self._shown_structures = {}
+        self._field_views = {}
+
+    def get_field_view(self, field_name):
+        """
+        Returns :class:`FieldView` of a field. It is built on first use.
+        """
+        try:
+            return self._field_views[field_name]
+        except KeyError:
+            pass
+
+        field = self.structure[field_name]
+
+        try:
+            field_snapshot = self.snapshot.fields[field_name]
+        except (AttributeError, KeyError):
+            from .field_types import render_field_type
+
+            view = FieldView(field_name,
+                             field,
+                             self.access_modes[field_name],
+                             render_field_type(field),
+                             tuple(field.alias or ()),
+                             getdoc(field),
+                             model_info=self)
+        else:
+            view = FieldView(field_name,
+                             field,
+                             self.access_modes[field_name],
+                             field_snapshot.type,
+                             field_snapshot.aliases,
+                             field_snapshot.docstring,
+                             default_fields=field_snapshot.default_fields,
+                             model_info=self)
+
+        self._field_views[field_name] = view
+        return view
+
+    def get_shown_structure(self, hidden_access_modes):
+        """
+        Returns visible structure without fields whose access mode name is in ``hidden_access_modes``
+        (a frozenset). It is computed once per set of hidden access modes.
+        """
+        try:
+            return self._shown_structures[hidden_access_modes]
+        except KeyError:
+            pass
+
+        shown = self._shown_structures[hidden_access_modes] = {
+            field_name: field
+            for field_name, field in self.visible_structure.items()
+            if self.access_modes[field_name].name not in hidden_access_modes
+        }
+        return shown
+
+    @property
+    def field_owners(self):
+        """
+        Dictionary of field name to class which defines it or overrides its access mode.
+        It is resolved on first use.
+        """
+        if self._field_owners is None:
+            self._field_owners = {field_name: get_field_owner(self.model, field_name)
+                                  for field_name in self.structure}
+        return self._field_owners
+
+    @property
+    def default_data(self):
+        if self._default_data is None:
+            with profile('default_data', get_class_path(self.model)):
+                self._default_data = self.model.get_default_data()
+        return self._default_data
+
+
+class IntrospectionCache:
+    """
+    Class keyed cache of :class:`ModelInfo`.
+
+    It lives as long as a build, so each model is introspected just once no matter
+    how many times it is documented or embedded.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self.source_digests = {}
+        self.class_ranges = {}
+        self.fingerprints = {}
+        self.local_fingerprints = {}
+        #: Dictionary of class path to :class:`~dirty_models_sphinx.snapshots.ModelSnapshot`.
+        #: They are taken when builder is initialized, so they are not cleared with introspected data.
+        self.snapshots = {}
+
+    def get_model_info(self, model):
+        if not isinstance(model, type):
+            model = type(model)
+
+        try:
+            return self._models[model]
+        except KeyError:
+            with profile('introspection', get_class_path(model)):
+                info = self._models[model] = ModelInfo(model, snapshot=self.snapshots.get(get_class_path(model)))
+            return info
+
+    def clear(self):
+        self._models.clear()
+        self.source_digests.clear()
+        self.class_ranges.clear()
+        self.fingerprints.clear()
+        self.local_fingerprints.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+
+def get_introspection_cache(app):
+    """
+    Returns introspection cache of Sphinx application.
+    """
+    try:
+        return app.dirty_models_introspection_cache
+    except AttributeError:
+        cache = app.dirty_models_introspection_cache = IntrospectionCache()
+        return cache
+
+
+def get_model_info(env, model):
+    """
+    Returns :class:`ModelInfo` of model for current build.
+    """
+    return get_introspection_cache(env.app).get_model_info(model)
+
+
+def get_access_modes(env, model):
+    """
+    Returns access mode table of a model: a dictionary of field name to resolved access mode.
+    It is computed once per model and build.
+    """
+    return get_model_info(env, model).access_modes
+
+
+def clear_introspection_cache(app, *args):
+    """
+    Invalidates introspection cache. It is connected to ``env-before-read-docs``
+    in order to drop introspected data when build environment is (re)loaded.
+    """
+    get_introspection_cache(app).clear()
@@ -0,0 +1,166 @@
+"""
+Build profiling
+"""
+
+import json
+import os
+from contextlib import nullcontext
+from timeit import default_timer
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILENAME = 'dirty_models_profile.json'
+
+_null_measure = nullcontext()
+
+_profiler = None
+
+
+class Measure:
+    """
+    Measures wall time of a phase. Time spent on nested measures is not included,
+    so times of all phases could be summed up.
+    """
+
+    __slots__ = ('profiler', 'phase', 'model', 'start', 'children')
+
+    def __init__(self, profiler, phase, model):
+        self.profiler = profiler
+        self.phase = phase
+        self.model = model
+        self.start = None
+        self.children = 0.0
+
+    def __enter__(self):
+        stack = self.profiler.stack
+        if self.model is None:
+            self.model = stack[-1].model if stack else ''
+        stack.append(self)
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = default_timer() - self.start
+        stack = self.profiler.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.profiler.record(self.model, self.phase, elapsed - self.children)
+
+
+class Profiler:
+    """
+    Records time and calls of each phase per model. Data is stored on build environment
+    per document, so it could be merged from parallel readers.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.stack = []
+
+    def record(self, model, phase, elapsed):
+        data = get_profile_data(self.env).setdefault(self.env.docname, {})
+        try:
+            item = data[(model, phase)]
+        except KeyError:
+            item = data[(model, phase)] = [0, 0.0]
+        item[0] += 1
+        item[1] += elapsed
+
+
+def profile(phase, model=None):
+    """
+    Returns a context manager which measures a phase. If model is not defined
+    it is inherited from enclosing measure. It does nothing if profiling is disabled.
+    """
+    if _profiler is None:
+        return _null_measure
+    return Measure(_profiler, phase, model)
+
+
+def get_profile_data(env):
+    try:
+        return env.dirty_models_profile
+    except AttributeError:
+        data = env.dirty_models_profile = {}
+        return data
+
+
+def get_object_path(modname, name):
+    return '{}.{}'.format(modname, name) if modname else name
+
+
+def get_class_path(cls):
+    return get_object_path(cls.__module__, cls.__qualname__)
+
+
+def start_profiling(app, env, docnames):
+    """
+    Enables profiling if ``dirty_model_profile`` is set. It is connected to ``env-before-read-docs``.
+    """
+    global _profiler
+
+    get_profile_data(env).clear()
+
+    if app.config.dirty_model_profile:
+        _profiler = Profiler(env)
+    else:
+        _profiler = None
+
+
+def merge_profile_data(app, env, docnames, other):
+    data = get_profile_data(env)
+    other_data = get_profile_data(other)
+    for docname in docnames:
+        try:
+            data[docname] = other_data[docname]
+        except KeyError:
+            pass
+
+
+def build_report(env):
+    models = {}
+    phases = {}
+
+    for doc_data in get_profile_data(env).values():
+        for (model, phase), (count, elapsed) in doc_data.items():
+            model_report = models.setdefault(model, {'time': 0.0, 'phases': {}})
+            model_report['time'] += elapsed
+
+            for item in (model_report['phases'].setdefault(phase, {'count': 0, 'time': 0.0}),
+                         phases.setdefault(phase, {'count': 0, 'time': 0.0})):
+                item['count'] += count
+                item['time'] += elapsed
+
+    return {'total': sum(item['time'] for item in phases.values()),
+            'phases': phases,
+            'models': models}
+
+
+def write_profile_report(app, exception):
+    """
+    Writes profile report as JSON and logs slowest models. It is connected to ``build-finished``.
+    """
+    global _profiler
+
+    if _profiler is None or exception is not None:
+        return
+
+    _profiler = None
+
+    report = build_report(app.env)
+    filename = os.path.join(app.outdir, REPORT_FILENAME)
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    logger.info('dirty models profile: %.3fs (report written to %s)', report['total'], filename)
+
+    for phase, item in sorted(report['phases'].items(), key=lambda i: i[1]['time'], reverse=True):
+        logger.info('    %-30s %10.3fs %8d calls', phase, item['time'], item['count'])
+
+    top = sorted(report['models'].items(), key=lambda i: i[1]['time'], reverse=True)
+    for model, item in top[:app.config.dirty_model_profile_top]:
+        slowest = max(item['phases'].items(), key=lambda i: i[1]['time'])[0]
+        logger.info('    %-60s %10.3fs (slowest phase: %s)', model or '<none>', item['time'], slowest)
@@ -0,0 +1,199 @@
+"""
+Cross reference resolution of models, enumerations and properties
+"""
+
+from typing import Any
+
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.errors import NoUri
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util.nodes import find_pending_xref_condition
+
+#: Object types registered by extension on Python domain (modules are resolved by Python domain)
+DIRTY_OBJTYPES = frozenset(('dirtyenum', 'dirtymodel', 'dirtymodelproperty', 'dirtymodeladditionalproperties'))
+
+
+class ReferenceIndex:
+    """
+    Index of Python domain objects used to resolve references to dirty model objects.
+
+    It is built once per write phase, when Python domain objects do not change anymore.
+    Fuzzy searches (references starting with ``.``) use an index of name suffixes instead
+    of crawling all objects, and their results are cached. Relative URIs between documents
+    are cached too.
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.objects = domain.objects
+        self._suffixes = None
+        self._fuzzy_matches = {}
+        self._uris = {}
+
+    @property
+    def suffixes(self):
+        if self._suffixes is None:
+            suffixes = {}
+            for name in self.objects:
+                pos = name.find('.')
+                while pos >= 0:
+                    suffixes.setdefault(name[pos:], []).append(name)
+                    pos = name.find('.', pos + 1)
+            self._suffixes = suffixes
+        return self._suffixes
+
+    def find_obj(self, modname, classname, name, type, searchmode=0):
+        """
+        Same as :meth:`sphinx.domains.python.PythonDomain.find_obj`, using indexes.
+        """
+        if name[-2:] == '()':
+            name = name[:-2]
+
+        if not name:
+            return []
+
+        objects = self.objects
+
+        if searchmode == 1:
+            if type is None:
+                objtypes = tuple(self.domain.object_types)
+            else:
+                objtypes = tuple(self.domain.objtypes_for_role(type) or ())
+
+            if not objtypes:
+                return []
+
+            candidates = []
+            if modname and classname:
+                candidates.append(modname + '.' + classname + '.' + name)
+            if modname:
+                candidates.append(modname + '.' + name)
+            candidates.append(name)
+
+            for candidate in candidates:
+                if candidate in objects and objects[candidate].objtype in objtypes:
+                    return [(candidate, objects[candidate])]
+
+            return self.find_fuzzy(name, objtypes)
+
+        for candidate in (name,
+                          classname and classname + '.' + name,
+                          modname and modname + '.' + name,
+                          modname and classname and modname + '.' + classname + '.' + name):
+            if candidate and candidate in objects:
+                return [(candidate, objects[candidate])]
+            if type == 'mod':
+                return []
+
+        return []
+
+    def find_fuzzy(self, name, objtypes):
+        key = (name, objtypes)
+        try:
+            return self._fuzzy_matches[key]
+        except KeyError:
+            pass
+
+        # Suffixes are indexed in same order than objects, so matches keep Python domain order
+        matches = self._fuzzy_matches[key] = [(oname, self.objects[oname])
+                                              for oname in self.suffixes.get('.' + name, [])
+                                              if self.objects[oname].objtype in objtypes]
+        return matches
+
+    def get_relative_uri(self, builder, fromdocname, todocname):
+        key = (fromdocname, todocname)
+        try:
+            return self._uris[key]
+        except KeyError:
+            uri = self._uris[key] = builder.get_relative_uri(fromdocname, todocname)
+            return uri
+
+    def make_refnode(self, builder, fromdocname, todocname, targetid, children, title):
+        """
+        Same as :func:`sphinx.util.nodes.make_refnode`, but relative URIs between documents
+        are computed once.
+        """
+        node = nodes.reference('', '', internal=True)
+        if fromdocname == todocname and targetid:
+            node['refid'] = targetid
+        elif targetid:
+            node['refuri'] = self.get_relative_uri(builder, fromdocname, todocname) + '#' + targetid
+        else:
+            node['refuri'] = self.get_relative_uri(builder, fromdocname, todocname)
+        if title:
+            node['reftitle'] = title
+        node += children
+        return node
+
+
+def get_reference_index(app):
+    """
+    Returns reference index of current write phase.
+    """
+    try:
+        return app.dirty_models_reference_index
+    except AttributeError:
+        index = app.dirty_models_reference_index = ReferenceIndex(app.env.get_domain('py'))
+        return index
+
+
+def clear_reference_index(app, *args):
+    """
+    Drops reference index. It is connected to ``env-updated``, so index is built again
+    after documents are read.
+    """
+    try:
+        del app.dirty_models_reference_index
+    except AttributeError:
+        pass
+
+
+class DirtyModelReferencesResolver(SphinxPostTransform):
+    """
+    Resolves Python domain references to models, enumerations and properties using
+    :class:`ReferenceIndex`. It runs before :class:`sphinx.transforms.post_transforms.ReferencesResolver`,
+    and it only resolves references which Python domain would resolve to same object without
+    any warning. Any other reference is left to Python domain.
+    """
+
+    default_priority = 5
+
+    def run(self, **kwargs: Any) -> None:
+        index = get_reference_index(self.app)
+
+        for node in list(self.document.findall(addnodes.pending_xref)):
+            if node.get('refdomain') != 'py':
+                continue
+
+            newnode = self.resolve(index, node)
+            if newnode is not None:
+                node.replace_self(newnode)
+
+    def resolve(self, index, node):
+        typ = node['reftype']
+        target = node['reftarget']
+        modname = node.get('py:module')
+        clsname = node.get('py:class')
+        searchmode = 1 if node.hasattr('refspecific') else 0
+
+        matches = index.find_obj(modname, clsname, target, typ, searchmode)
+        if len(matches) != 1 or matches[0][1].objtype not in DIRTY_OBJTYPES:
+            return None
+
+        name, obj = matches[0]
+
+        # Same content than Python domain uses. Pending reference node is replaced, so its
+        # content is moved to new node instead of copied.
+        content = find_pending_xref_condition(node, 'resolved')
+        if content:
+            children = content.children
+        else:
+            content = find_pending_xref_condition(node, '*')
+            children = [(content or node)[0]]
+
+        node.setdefault('refdoc', self.env.docname)
+        try:
+            return index.make_refnode(self.app.builder, node['refdoc'], obj.docname, obj.node_id, children, name)
+        except NoUri:
+            return None
@@ -0,0 +1,230 @@
+"""
+Offline reST renderer
+
+It renders reST of every model and enumeration of some packages, using same documenters
+as a Sphinx build, but without reading, parsing or writing any document::
+
+    $ python -m dirty_models_sphinx render -o build/models --jobs 4 myapp.models
+
+A Sphinx application is only created to hold configuration and registered documenters.
+Modules could be rendered in parallel by a pool of processes.
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from multiprocessing.util import Finalize
+
+from sphinx.util import logging
+
+from .discovery import discover_module_classes, iter_module_names
+from .introspection import is_model_class
+from .stubs import write_if_changed
+
+logger = logging.getLogger(__name__)
+
+#: Configuration used to render offline. Structures must be rendered as reST, and documentation
+#: is not recorded on build environment.
+RENDER_OVERRIDES = {'dirty_model_structure_renderer': 'rest',
+                    'dirty_model_cache': False,
+                    'dirty_model_profile': False,
+                    'dirty_model_stubs': [],
+                    'dirty_model_preload': []}
+
+_app = None
+
+
+def make_render_app(tmpdir, confdir=None, overrides=None):
+    """
+    Creates a Sphinx application with no documents on ``tmpdir``. If ``confdir`` is ``None``,
+    no configuration file is used.
+    """
+    from sphinx.application import Sphinx
+
+    confoverrides = dict(overrides or {})
+    if confdir is None:
+        confoverrides.setdefault('extensions', ['sphinx.ext.autodoc', 'dirty_models_sphinx'])
+    confoverrides.update(RENDER_OVERRIDES)
+
+    return Sphinx(tmpdir, confdir, os.path.join(tmpdir, '_build'), os.path.join(tmpdir, '_doctrees'),
+                  'dummy', confoverrides=confoverrides, status=None, warning=sys.stderr)
+
+
+class RenderState:
+    """
+    Directive state used to render offline. Documenters only read settings of its document.
+    """
+
+    def __init__(self, source_path):
+        from docutils.parsers.rst import Parser
+        from sphinx.util.docutils import new_document
+
+        try:
+            from docutils.frontend import get_default_settings
+        except ImportError:  # docutils < 0.19
+            from docutils.frontend import OptionParser
+            settings = OptionParser(components=(Parser,)).get_default_values()
+        else:
+            settings = get_default_settings(Parser)
+
+        self.document = new_document(source_path, settings)
+
+
+def render_class(app, modname, name, cls):
+    """
+    Returns reST lines generated for a model or enumeration.
+    """
+    from sphinx.ext.autodoc import Options
+    from sphinx.ext.autodoc.directive import DocumenterBridge
+    from sphinx.util.docutils import LoggingReporter
+
+    from .documenters import DirtyEnumDocumenter, DirtyModelDocumenter
+
+    documenter_class = DirtyModelDocumenter if is_model_class(cls) else DirtyEnumDocumenter
+    options = Options(app.config.autodoc_default_options)
+    bridge = DocumenterBridge(app.env, LoggingReporter(''), options, 1, RenderState(modname))
+
+    documenter = documenter_class(bridge, '{}::{}'.format(modname, name))
+    documenter.generate(all_members=True, real_modname=modname)
+
+    app.env.temp_data['autodoc:module'] = None
+    app.env.temp_data['autodoc:class'] = None
+    return list(bridge.result)
+
+
+def render_module(app, modname, include=None, exclude=None, private=False):
+    """
+    Returns reST document of models and enumerations defined on a module,
+    or ``None`` if it does not define any.
+    """
+    module = import_module(modname)
+    classes = discover_module_classes(module, include=include, exclude=exclude, private=private)
+    if not classes:
+        return None
+
+    app.env.temp_data['docname'] = modname
+
+    lines = [modname, '=' * len(modname), '', '.. currentmodule:: {}'.format(modname), '']
+    for cls_modname, name, cls in classes:
+        lines.extend(render_class(app, cls_modname, name, cls))
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def init_worker(confdir, overrides):
+    global _app
+    # Worker processes do not run atexit handlers, but they run multiprocessing finalizers
+    # when pool is shut down
+    tmpdir = tempfile.TemporaryDirectory(prefix='dirty_models_render_')
+    Finalize(None, tmpdir.cleanup, exitpriority=0)
+    _app = make_render_app(tmpdir.name, confdir, overrides)
+
+
+def render_module_worker(args):
+    """
+    Renders a module on a worker process. It returns a tuple of module name, document and error message.
+    """
+    modname, include, exclude, private = args
+    try:
+        return modname, render_module(_app, modname, include=include, exclude=exclude, private=private), None
+    except Exception as ex:
+        return modname, None, '{}: {}'.format(type(ex).__name__, ex)
+
+
+def render_modules(modules, recursive=True, include=None, exclude=None, private=False, jobs=1,
+                   confdir=None, overrides=None):
+    """
+    Yields ``(module name, document)`` for each module (and submodule, if ``recursive``)
+    which defines models or enumerations, sorted by module name. Modules are rendered by
+    a pool of ``jobs`` processes (number of CPUs, if it is ``None``).
+    """
+    global _app
+
+    modnames = []
+    for modname in modules:
+        try:
+            modnames.extend(iter_module_names(import_module(modname), recursive=recursive, private=private))
+        except Exception as ex:
+            logger.warning('[dirty_models_sphinx] failed to import module %s: %s', modname, ex)
+
+    tasks = [(modname, include, exclude, private) for modname in sorted(set(modnames))]
+
+    if jobs == 1:
+        with tempfile.TemporaryDirectory(prefix='dirty_models_render_') as tmpdir:
+            _app = make_render_app(tmpdir, confdir, overrides)
+            try:
+                yield from iter_rendered(map(render_module_worker, tasks))
+            finally:
+                _app = None
+        return
+
+    executor = ProcessPoolExecutor(max_workers=jobs or os.cpu_count(),
+                                   initializer=init_worker,
+                                   initargs=(confdir, overrides))
+    try:
+        yield from iter_rendered(executor.map(render_module_worker, tasks))
+    finally:
+        executor.shutdown()
+
+
+def iter_rendered(results):
+    for modname, document, error in results:
+        if error is not None:
+            logger.warning('[dirty_models_sphinx] failed to render module %s: %s', modname, error)
+        elif document is not None:
+            yield modname, document
+
+
+def parse_override(arg):
+    name, sep, value = arg.partition('=')
+    if not sep:
+        raise ValueError('override must be NAME=VALUE: {}'.format(arg))
+    return name, value
+
+
+def main(argv=None):
+    """
+    Command line entry point of offline renderer.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m dirty_models_sphinx render',
+                                     description='Render reST of every model and enumeration of packages '
+                                                 'without building a Sphinx project.')
+    parser.add_argument('modules', nargs='+', help='packages or modules to document')
+    parser.add_argument('-o', '--output-dir', help='directory where a document per module is written '
+                                                   '(by default, documents are written to standard output)')
+    parser.add_argument('-c', '--conf-dir', help='directory of conf.py file to use')
+    parser.add_argument('-D', dest='overrides', action='append', default=[], type=parse_override,
+                        metavar='NAME=VALUE', help='override a configuration value')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of processes used to render modules (0 for number of CPUs)')
+    parser.add_argument('--no-recursive', dest='recursive', action='store_false',
+                        help='do not look for models on submodules')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                        help='document only models whose dotted path matches pattern')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='do not document models whose dotted path matches pattern')
+    parser.add_argument('--private', action='store_true', help='document private modules and models')
+
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for modname, document in render_modules(args.modules,
+                                            recursive=args.recursive,
+                                            include=args.include,
+                                            exclude=args.exclude,
+                                            private=args.private,
+                                            jobs=args.jobs or None,
+                                            confdir=args.conf_dir,
+                                            overrides=dict(args.overrides)):
+        if args.output_dir:
+            write_if_changed(os.path.join(args.output_dir, modname + '.rst'), document)
+        else:
+            sys.stdout.write(document)
+            sys.stdout.write('\n')
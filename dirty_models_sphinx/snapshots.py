@@ -0,0 +1,158 @@
+"""
+Model snapshots taken on a process pool
+
+Model modules are imported and introspected by worker processes, which extract picklable
+snapshots of their models: field types, default values rendered as reST, docstrings
+and aliases. Documenters use them instead of rendering those values again.
+
+Modules are still imported on main process by `autodoc`, because it needs real objects
+to document them. So it is experimental and disabled by default: every module is imported
+twice and a process pool is started (see ``benchmarks/bench_preload.py``).
+"""
+
+import os
+from importlib import import_module
+from inspect import getdoc
+from timeit import default_timer
+
+from sphinx.util import logging
+
+from .discovery import discover_module_classes, iter_module_names
+from .introspection import ModelInfo, get_introspection_cache, is_model_class
+from .profiling import get_class_path
+
+logger = logging.getLogger(__name__)
+
+
+class FieldSnapshot:
+    """
+    Picklable snapshot of a model field.
+    """
+
+    __slots__ = ('name', 'type', 'aliases', 'docstring', 'default_fields')
+
+    def __init__(self, name, type, aliases, docstring, default_fields):
+        self.name = name
+        #: Field type as reST
+        self.type = type
+        #: Tuple of aliases
+        self.aliases = aliases
+        self.docstring = docstring
+        #: Tuple of default value fields rendered for a property and for a structure
+        self.default_fields = default_fields
+
+    def __reduce__(self):
+        return type(self), (self.name, self.type, self.aliases, self.docstring, self.default_fields)
+
+
+class ModelSnapshot:
+    """
+    Picklable snapshot of a model.
+    """
+
+    __slots__ = ('path', 'docstring', 'fields')
+
+    def __init__(self, path, docstring, fields):
+        #: Dotted path of model class
+        self.path = path
+        self.docstring = docstring
+        #: Dictionary of field name to :class:`FieldSnapshot`
+        self.fields = fields
+
+    def __reduce__(self):
+        return type(self), (self.path, self.docstring, self.fields)
+
+
+def take_model_snapshot(model):
+    """
+    Returns :class:`ModelSnapshot` of a model class.
+    """
+    from .documenters import get_default_value_fields
+    from .field_types import render_field_type
+
+    model_info = ModelInfo(model)
+
+    fields = {}
+    for field_name, field in model_info.structure.items():
+        default = model_info.default_data.get(field_name)
+        formatted = hasattr(field, 'get_formatted_value')
+        default_fields = tuple(tuple(get_default_value_fields(field, default=default, as_structure=as_structure,
+                                                              formatted=formatted))
+                               for as_structure in (False, True))
+
+        fields[field_name] = FieldSnapshot(field_name,
+                                           render_field_type(field),
+                                           tuple(field.alias or ()),
+                                           getdoc(field),
+                                           default_fields)
+
+    return ModelSnapshot(get_class_path(model), getdoc(model), fields)
+
+
+def take_module_snapshots(modname):
+    """
+    Imports a module and returns a tuple of module name, list of snapshots of models defined
+    on it and error message, if it failed. It runs on worker processes.
+    """
+    try:
+        module = import_module(modname)
+        return modname, [take_model_snapshot(cls) for _, _, cls in discover_module_classes(module, private=True)
+                         if is_model_class(cls)], None
+    except Exception as ex:
+        return modname, [], '{}: {}'.format(type(ex).__name__, ex)
+
+
+def take_snapshots(modules, jobs=None):
+    """
+    Takes snapshots of models defined on modules (and their submodules) using a pool of ``jobs``
+    processes (number of CPUs, if it is ``None``). It returns a dictionary of class path to
+    :class:`ModelSnapshot`. Modules which could not be imported are skipped with a warning.
+    """
+    modnames = []
+    for modname in modules:
+        try:
+            modnames.extend(iter_module_names(import_module(modname), recursive=True, private=True))
+        except Exception as ex:
+            logger.warning('[dirty_models_sphinx] failed to import module %s: %s', modname, ex)
+
+    snapshots = {}
+    if not modnames:
+        return snapshots
+
+    if jobs == 1:
+        results = map(take_module_snapshots, modnames)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=jobs or os.cpu_count())
+        results = executor.map(take_module_snapshots, modnames)
+
+    try:
+        for modname, module_snapshots, error in results:
+            if error is not None:
+                logger.warning('[dirty_models_sphinx] failed to preload module %s: %s', modname, error)
+                continue
+
+            snapshots.update((snapshot.path, snapshot) for snapshot in module_snapshots)
+    finally:
+        if jobs != 1:
+            executor.shutdown()
+
+    return snapshots
+
+
+def preload_snapshots(app):
+    """
+    Takes snapshots of models on packages of ``dirty_model_preload`` configuration value.
+    It is connected to ``builder-inited``, so they are ready before documents are read.
+    """
+    config = app.config
+    cache = get_introspection_cache(app)
+    cache.snapshots.clear()
+
+    if not config.dirty_model_preload:
+        return
+
+    start = default_timer()
+    cache.snapshots.update(take_snapshots(config.dirty_model_preload, jobs=config.dirty_model_preload_jobs or None))
+    logger.info('[dirty_models_sphinx] preloaded %d models in %.2f s', len(cache.snapshots), default_timer() - start)
@@ -0,0 +1,176 @@
+"""
+Stub pages generator
+
+It writes a reST page per model and enumeration of some packages. Pages whose
+content did not change are not written, so they keep their modification times
+and Sphinx does not read them again.
+
+It could be used from command line::
+
+    $ python -m dirty_models_sphinx stubs -o docs/models myapp.models
+
+or on each build, using ``dirty_model_stubs`` configuration value.
+"""
+
+import os
+from importlib import import_module
+
+from sphinx.util import logging
+from sphinx.util.rst import escape
+
+from .discovery import discover_classes
+from .introspection import is_model_class
+
+logger = logging.getLogger(__name__)
+
+STUB_HEADER = '.. This file is generated by dirty_models_sphinx.stubs. Do not edit it.'
+
+STUB_SUFFIX = '.rst'
+
+
+def render_stub(modname, name, cls, options=None):
+    """
+    Returns content of stub page of a model or enumeration.
+    """
+    directive = 'autodirtymodel' if is_model_class(cls) else 'autodirtyenum'
+    title = escape('{}.{}'.format(modname, name))
+
+    lines = [STUB_HEADER,
+             '',
+             title,
+             '=' * len(title),
+             '',
+             '.. currentmodule:: {}'.format(modname),
+             '',
+             '.. {}:: {}'.format(directive, name)]
+
+    for option, value in sorted((options or {}).items()):
+        lines.append('    :{}:{}'.format(option, '' if value is None else ' {}'.format(value)))
+
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def write_if_changed(filename, content):
+    """
+    Writes a file only if its content changed. It returns whether file was written.
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    tmp_filename = '{}.{}'.format(filename, os.getpid())
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+    return True
+
+
+def is_stub(filename):
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return f.readline().rstrip('\n') == STUB_HEADER
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def generate_stubs(modules, output_dir, recursive=True, include=None, exclude=None, private=False,
+                   options=None):
+    """
+    Writes a stub page, named by dotted path, for each model and enumeration of ``modules``.
+    Stubs which are not generated anymore are removed. Other files on ``output_dir`` are kept.
+
+    It returns a tuple of lists of written, unchanged and removed files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    written = []
+    unchanged = []
+    filenames = set()
+
+    for modname in modules:
+        try:
+            module = import_module(modname)
+        except Exception as ex:
+            logger.warning('[dirty_models_sphinx] failed to import module %s: %s', modname, ex)
+            continue
+
+        for cls_modname, name, cls in discover_classes(module, recursive=recursive, include=include,
+                                                       exclude=exclude, private=private):
+            filename = os.path.join(output_dir, '{}.{}{}'.format(cls_modname, name, STUB_SUFFIX))
+            if filename in filenames:
+                continue
+            filenames.add(filename)
+
+            if write_if_changed(filename, render_stub(cls_modname, name, cls, options)):
+                written.append(filename)
+            else:
+                unchanged.append(filename)
+
+    removed = []
+    for entry in sorted(os.listdir(output_dir)):
+        filename = os.path.join(output_dir, entry)
+        if entry.endswith(STUB_SUFFIX) and filename not in filenames and is_stub(filename):
+            os.remove(filename)
+            removed.append(filename)
+
+    return written, unchanged, removed
+
+
+def generate_model_stubs(app):
+    """
+    Generates stub pages of packages on ``dirty_model_stubs`` configuration value.
+    It is connected to ``builder-inited``, so stubs are written before Sphinx looks for outdated documents.
+    """
+    config = app.config
+    if not config.dirty_model_stubs:
+        return
+
+    written, unchanged, removed = generate_stubs(config.dirty_model_stubs,
+                                                 os.path.join(app.srcdir, config.dirty_model_stubs_dir),
+                                                 recursive=config.dirty_model_stubs_recursive,
+                                                 include=config.dirty_model_stubs_include,
+                                                 exclude=config.dirty_model_stubs_exclude,
+                                                 options=config.dirty_model_stubs_options)
+
+    logger.info('[dirty_models_sphinx] model stubs: %d written, %d unchanged, %d removed',
+                len(written), len(unchanged), len(removed))
+
+
+def main(argv=None):
+    """
+    Command line entry point of stub pages generator.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m dirty_models_sphinx stubs',
+                                     description='Generate a reST page per model and enumeration of packages. '
+                                                 'Pages whose content did not change are not written.')
+    parser.add_argument('modules', nargs='+', help='packages or modules to document')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory where pages are written')
+    parser.add_argument('--no-recursive', dest='recursive', action='store_false',
+                        help='do not look for models on submodules')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                        help='document only models whose dotted path matches pattern')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='do not document models whose dotted path matches pattern')
+    parser.add_argument('--private', action='store_true', help='document private modules and models')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not show written and removed files')
+
+    args = parser.parse_args(argv)
+
+    written, unchanged, removed = generate_stubs(args.modules, args.output_dir,
+                                                 recursive=args.recursive,
+                                                 include=args.include,
+                                                 exclude=args.exclude,
+                                                 private=args.private)
+
+    if not args.quiet:
+        for filename in written:
+            print('written {}'.format(filename))
+        for filename in removed:
+            print('removed {}'.format(filename))
+        print('{} written, {} unchanged, {} removed'.format(len(written), len(unchanged), len(removed)))